@@ -0,0 +1,173 @@
+"""Code shared by the main agent and the sub-agents: parameter conversion and prompt memory."""
+
+from typing import Callable, Dict, Any, List
+from django.db.models import F, Func, JSONField, Model, Value
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from friday_night_assistant import json_utils
+
+
+# Stringhe interpretate come True nei parametri bool
+TRUE_VALUES = frozenset(('true', '1', 'yes'))
+# Tipo dichiarato nella specifica -> tipo Python: un valore già di quel tipo non va convertito
+PARAM_TYPES = {'int': int, 'float': float, 'bool': bool, 'list': list, 'dict': dict, 'str': str}
+
+
+def convert_to_bool(value: Any) -> bool:
+    """Converte un valore a boolean."""
+    if isinstance(value, str):
+        # Caso comune: valore già normalizzato, nessuna stringa intermedia
+        return value in TRUE_VALUES or value.lower() in TRUE_VALUES
+    return bool(value)
+
+
+def convert_to_list(value: Any) -> List:
+    """Converte un valore a lista."""
+    if isinstance(value, str):
+        try:
+            return json_utils.loads(value)
+        except json_utils.JSONDecodeError:
+            return [item.strip() for item in value.split(',')]
+    elif isinstance(value, list):
+        return value
+    else:
+        return [value]
+
+
+# Tipo dichiarato nella specifica -> funzione di conversione ('dict' è gestito a parte da chi
+# converte, perché ha bisogno del nome del parametro)
+TYPE_CONVERTERS: Dict[str, Callable[[Any], Any]] = {
+    'int': int,
+    'float': float,
+    'bool': convert_to_bool,
+    'list': convert_to_list,
+    'str': str,
+}
+
+
+class ParameterConversionMixin:
+    """Conversione degli argomenti scelti dall'LLM ai tipi dichiarati nella specifica dei metodi.
+
+    Le classi che la usano definiscono `_log_parameter_warning(param_name, message)` e
+    `_log_conversion_error(param_name, param_value, param_type, error)`.
+    """
+
+    def _convert_parameter_types(self, args: Dict[str, Any], method_spec: Dict[str, Any]) -> Dict[str, Any]:
+        """Converte i parametri ai tipi corretti basandosi sulla specifica del metodo."""
+        converted_args = {}
+        parameters_spec = method_spec.get('parameters', {})
+
+        for param_name, param_value in args.items():
+            if param_name not in parameters_spec:
+                self._log_parameter_warning(param_name, "non trovato nella specifica")
+                converted_args[param_name] = param_value
+                continue
+
+            param_type = parameters_spec[param_name].get('type', 'str')
+            converted_args[param_name] = self._convert_single_parameter(
+                param_name, param_value, param_type
+            )
+
+        return converted_args
+
+    def _convert_single_parameter(self, param_name: str, param_value: Any, param_type: str) -> Any:
+        """Converte un singolo parametro al tipo specificato."""
+        try:
+            if param_value is None or type(param_value) is PARAM_TYPES.get(param_type):
+                return param_value
+            if param_type == 'dict':
+                return self._convert_to_dict(param_name, param_value)
+            return TYPE_CONVERTERS.get(param_type, str)(param_value)
+
+        except (ValueError, TypeError, json_utils.JSONDecodeError) as e:
+            self._log_conversion_error(param_name, param_value, param_type, e)
+            return param_value
+
+    def _convert_to_dict(self, param_name: str, value: Any) -> Dict:
+        """Converte un valore a dizionario."""
+        if isinstance(value, str):
+            return json_utils.loads(value)
+        elif isinstance(value, dict):
+            return value
+        else:
+            self._log_parameter_warning(param_name, "impossibile convertire a dict")
+            return value
+
+
+class AgentMemoryMixin:
+    """Memoria delle azioni nel prompt, comune al main agent e ai sotto-agenti.
+
+    Le classi che la usano definiscono `_get_previous_memories(after_id)` e
+    `_format_memory_section()`.
+    """
+
+    # Numero massimo di memorie recenti incluse nel prompt
+    MEMORY_WINDOW = 50
+    # Oltre questa lunghezza il risultato di un'azione viene accorciato nel prompt
+    MEMORY_RESULT_MAX_CHARS = 2048
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Memorie già formattate: a ogni iterazione si leggono solo le righe con id > _last_memory_id
+        self._memory_blocks: List[str] = []
+        self._memory_count = 0
+        self._last_memory_id = 0
+
+    def _update_memory_with_result(self, memory_record: Model, result: Any) -> None:
+        """Aggiorna un record di memoria (AgentMemory) con il risultato dell'esecuzione.
+
+        Imposta solo la chiave 'result' lato database (JSON_SET), senza riscrivere l'intero valore.
+        """
+        result_json = Cast(Value(json_utils.dumps(result, default=str)), output_field=JSONField())
+        type(memory_record).objects.filter(pk=memory_record.pk).update(
+            value=Func(F('value'), Value('$.result'), result_json, function='JSON_SET', output_field=JSONField()),
+            updated_at=timezone.now()
+        )
+
+    def _refresh_memory(self) -> None:
+        """Formatta solo le memorie salvate dopo l'ultima lettura e le aggiunge a quelle in cache."""
+        for memory_id, memory in self._get_previous_memories(self._last_memory_id):
+            self._memory_count += 1
+            self._memory_blocks.append("\n".join(self._format_single_memory(self._memory_count, memory)))
+            self._last_memory_id = memory_id
+
+        # Nel prompt restano solo le azioni più recenti
+        del self._memory_blocks[:-self.MEMORY_WINDOW]
+
+    def _format_single_memory(self, idx: int, memory: Dict[str, Any]) -> List[str]:
+        """Formatta una singola memoria."""
+        action = memory.get('action', 'N/A')
+        args = memory.get('args', {})
+        reason = memory.get('reason', 'N/A')
+        result = memory.get('result')
+
+        lines = [
+            f"\n{idx}. Azione: {action}",
+            f"   Parametri: {json_utils.dumps(args, sort_keys=True)}",
+            f"   Motivazione: {reason}"
+        ]
+
+        if result is not None:
+            result_line = self._format_memory_result(result)
+            lines.append(result_line)
+        else:
+            lines.append("   ⏳ Risultato: In attesa...")
+
+        return lines
+
+    def _format_memory_result(self, result: Any) -> str:
+        """Formatta il risultato di una memoria."""
+        if isinstance(result, dict) and result.get('error'):
+            return f"   ❌ Risultato: ERRORE - {result['error']}"
+        else:
+            result_text = self._truncate_result(json_utils.dumps(result, sort_keys=True, default=str))
+            return f"   ✓ Risultato ottenuto: {result_text}"
+
+    def _truncate_result(self, text: str) -> str:
+        """Accorcia i risultati troppo lunghi tenendo inizio e fine, per limitare la dimensione del prompt."""
+        if len(text) <= self.MEMORY_RESULT_MAX_CHARS:
+            return text
+        half = self.MEMORY_RESULT_MAX_CHARS // 2
+        elided = len(text) - 2 * half
+        return f"{text[:half]} ...<{elided} caratteri omessi>... {text[-half:]}"
@@ -14,30 +14,32 @@ class DatabaseAppsRouter:
     mysql_apps = {'mysql_models'}
     pg_apps = {'pg_models'}
 
+    # Flat app_label -> db alias table, so each routing call is a single dict lookup
+    _APP_TO_DB = {
+        **{app: 'default' for app in mysql_apps},
+        **{app: 'postgres' for app in pg_apps},
+    }
+
+    # Django built-in apps (auth, contenttypes, admin, sessions)
+    django_apps = frozenset({'auth', 'contenttypes', 'admin', 'sessions'})
+
     def db_for_read(self, model, **hints):
-        if model._meta.app_label in self.mysql_apps:
-            return 'default'
-        if model._meta.app_label in self.pg_apps:
-            return 'postgres'
-        return None
+        return self._APP_TO_DB.get(model._meta.app_label)
 
     def db_for_write(self, model, **hints):
-        if model._meta.app_label in self.mysql_apps:
-            return 'default'
-        if model._meta.app_label in self.pg_apps:
-            return 'postgres'
-        return None
+        return self._APP_TO_DB.get(model._meta.app_label)
 
     def allow_relation(self, obj1, obj2, **hints):
+        label1 = obj1._meta.app_label
+        label2 = obj2._meta.app_label
+
         # Allow relations if both objects are in the same routed app group
-        if obj1._meta.app_label in self.mysql_apps and obj2._meta.app_label in self.mysql_apps:
-            return True
-        if obj1._meta.app_label in self.pg_apps and obj2._meta.app_label in self.pg_apps:
+        db1 = self._APP_TO_DB.get(label1)
+        if db1 is not None and db1 == self._APP_TO_DB.get(label2):
             return True
 
-        # Allow relations for Django built-in apps (auth, contenttypes, admin, sessions)
-        django_apps = {'auth', 'contenttypes', 'admin', 'sessions'}
-        if obj1._meta.app_label in django_apps or obj2._meta.app_label in django_apps:
+        # Allow relations for Django built-in apps
+        if label1 in self.django_apps or label2 in self.django_apps:
             return True
 
         # No cross-db relations
@@ -46,12 +48,9 @@ class DatabaseAppsRouter:
     def allow_migrate(self, db, app_label, model_name=None, **hints):
         """Ensure the mysql_models app's models appear only in the 'default' DB
         and pg_models in the 'postgres' DB. For apps not listed, allow migrations on default.
+
+        pg_models sets managed = False on its models, so typically nothing is
+        migrated there, but migrations are allowed on postgres if you decide
+        to manage them with Django.
         """
-        if app_label in self.mysql_apps:
-            return db == 'default'
-        if app_label in self.pg_apps:
-            # pg_models we set managed = False on their models, so typically return False
-            # but allow migrations on postgres if you decide to manage them with Django
-            return db == 'postgres'
-        # Default behaviour
-        return db == 'default'
+        return db == self._APP_TO_DB.get(app_label, 'default')
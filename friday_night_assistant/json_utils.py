@@ -0,0 +1,54 @@
+"""JSON helpers backed by orjson, with a stdlib fallback."""
+
+import json
+from typing import Any, Callable, Optional
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - stdlib fallback
+    orjson = None
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so one except clause covers both
+JSONDecodeError = json.JSONDecodeError
+
+
+def dumps(
+        obj: Any,
+        indent: bool = False,
+        sort_keys: bool = False,
+        default: Optional[Callable[[Any], Any]] = None
+) -> str:
+    """Serialize `obj` to a UTF-8 JSON string (non-ASCII characters are kept as is).
+
+    `indent=True` pretty-prints with two spaces; `default` is called for
+    objects that are not natively serializable, as in `json.dumps`.
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=default, option=option).decode('utf-8')
+
+    return json.dumps(
+        obj,
+        ensure_ascii=False,
+        indent=2 if indent else None,
+        sort_keys=sort_keys,
+        default=default
+    )
+
+
+def loads(data: Any) -> Any:
+    """Parse a JSON document from str or bytes."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    """Serialize `obj` to UTF-8 JSON bytes, e.g. for an HTTP request body."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
@@ -0,0 +1,18 @@
+"""Shared Ollama chat client."""
+
+from functools import lru_cache
+
+import httpx
+from django.conf import settings
+from ollama import Client
+
+MAX_KEEPALIVE_CONNECTIONS = 8
+
+
+@lru_cache(maxsize=1)
+def get_ollama_client() -> Client:
+    """Return the process-wide Ollama client, so its connection pool is reused across calls."""
+    return Client(
+        host=settings.OLLAMA_FULL_HOST,
+        limits=httpx.Limits(max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS)
+    )
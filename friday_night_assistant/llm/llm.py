@@ -1,18 +1,55 @@
 """Simple LLM client for Ollama API."""
 
-import json
 import logging
+import random
 import time
-from typing import Any, Callable
+from typing import Any, Callable, Dict, Iterator, Optional
 from functools import wraps
 
 import requests
+from requests.adapters import HTTPAdapter
+from requests.exceptions import RequestException
+
+from friday_night_assistant import json_utils
 
 logger = logging.getLogger(__name__)
 
 
-def retry(max_retries: int = 3) -> Callable:
-    """Decorator to retry a function on exception."""
+RETRY_AFTER_STATUSES = {429, 503}
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+def _network_error(e: Exception) -> Optional[Exception]:
+    """Return the underlying requests exception if `e` is (or wraps) one."""
+    for candidate in (e, e.__cause__):
+        if isinstance(candidate, RequestException):
+            return candidate
+    return None
+
+
+def _retry_after_seconds(error: Exception) -> Optional[float]:
+    """Read the Retry-After header (in seconds) from a 429/503 response, if any."""
+    response = getattr(error, "response", None)
+    if response is None or response.status_code not in RETRY_AFTER_STATUSES:
+        return None
+    try:
+        return max(0.0, float(response.headers.get("Retry-After")))
+    except (TypeError, ValueError):
+        return None
+
+
+def retry(
+        max_retries: int = 3,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        jitter: float = 0.5
+) -> Callable:
+    """Decorator to retry a function on network errors with exponential backoff.
+
+    The delay before attempt N+1 is `base_delay * 2**(N-1)`, capped at `max_delay`
+    and stretched by a random factor in [1, 1 + jitter]. A Retry-After header on
+    429/503 responses takes precedence over the computed delay.
+    """
 
     def decorator(func: Callable) -> Callable:
         @wraps(func)
@@ -23,19 +60,29 @@ def retry(max_retries: int = 3) -> Callable:
                     return func(*args, **kwargs)
                 except Exception as e:
                     # Retry only on network-related exceptions from requests
-                    try:
-                        from requests.exceptions import RequestException
-                        is_network_error = isinstance(e, RequestException)
-                    except Exception:
-                        is_network_error = False
-
-                    if not is_network_error:
+                    network_error = _network_error(e)
+                    if network_error is None:
                         # Non-retryable exception, raise immediately
                         raise
 
+                    # Client errors (except rate limiting) will not succeed on retry
+                    response = getattr(network_error, "response", None)
+                    if response is not None and 400 <= response.status_code < 500 \
+                            and response.status_code not in RETRY_AFTER_STATUSES:
+                        raise
+
                     last_exception = e
                     logger.warning(f"Attempt {attempt}/{max_retries} failed: {e}")
 
+                    if attempt == max_retries:
+                        break
+
+                    delay = _retry_after_seconds(network_error)
+                    if delay is None:
+                        delay = min(max_delay, base_delay * (2 ** (attempt - 1)))
+                        delay *= 1 + random.random() * jitter
+                    time.sleep(min(delay, max_delay))
+
             logger.error(f"Max retries ({max_retries}) exceeded")
             raise last_exception or Exception("Max retries exceeded")
 
@@ -54,6 +101,8 @@ class LLM:
 
     DEFAULT_MODEL = "gemma3"
     DEFAULT_API_URL = "http://localhost:11434/api/generate"
+    POOL_CONNECTIONS = 10
+    POOL_MAXSIZE = 20
 
     def __init__(self, model: str = DEFAULT_MODEL, api_url: str = DEFAULT_API_URL):
         """
@@ -66,12 +115,66 @@ class LLM:
         self.model = model
         self.api_url = api_url
 
+        # Reuse TCP connections to Ollama across calls instead of reconnecting per request
+        adapter = HTTPAdapter(
+            pool_connections=self.POOL_CONNECTIONS,
+            pool_maxsize=self.POOL_MAXSIZE,
+            max_retries=0
+        )
+        self._session = requests.Session()
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    def close(self) -> None:
+        """Close the underlying HTTP session and release pooled connections."""
+        self._session.close()
+
+    def _build_payload(self, prompt: str, json_mode: bool, stream: bool) -> Dict[str, Any]:
+        """Build the request payload for the Ollama generate endpoint."""
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": stream
+        }
+
+        if json_mode:
+            payload["format"] = "json"
+
+        return payload
+
+    @staticmethod
+    def _parse_response(content: bytes) -> Any:
+        """Extract the generated text from a non-streamed Ollama response body."""
+        # Parse the raw bytes once; decode to text only if they are not JSON
+        try:
+            result = json_utils.loads(content)
+        except ValueError:
+            raw_text = content.decode("utf-8", "replace")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("LLM: response is not valid JSON, returning raw text (len=%d)", len(raw_text))
+            return raw_text
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("LLM: json response size=%d", len(content))
+
+        return result.get("response", result)
+
+    @staticmethod
+    def _parse_json_output(response: Any) -> Any:
+        """Parse the JSON document produced by the model in json_mode."""
+        try:
+            return json_utils.loads(response)
+        except (ValueError, TypeError) as e:
+            logger.error(f"Failed to parse JSON response: {e}")
+            raise LLMException(f"Invalid JSON response: {e}") from e
+
     @retry(max_retries=3)
     def generate(
             self,
             prompt: str,
             json_mode: bool = False,
-            timeout: int = 120
+            timeout: int = 120,
+            stream: bool = False
     ) -> str:
         """
         Generate a response from the LLM.
@@ -80,6 +183,8 @@ class LLM:
             prompt: Input prompt
             json_mode: Whether to return JSON format
             timeout: Request timeout in seconds
+            stream: Read the response incrementally (see `generate_stream`)
+                and join the pieces instead of buffering one large JSON body
 
         Returns:
             Generated response text
@@ -87,63 +192,96 @@ class LLM:
         Raises:
             LLMException: On API errors
         """
-        payload = {
-            "model": self.model,
-            "prompt": prompt,
-            "stream": False
-        }
+        if stream:
+            return "".join(self.generate_stream(prompt, json_mode=json_mode, timeout=timeout))
 
-        if json_mode:
-            payload["format"] = "json"
+        payload = self._build_payload(prompt, json_mode, stream=False)
 
         try:
-            # Log diagnostics: prompt size and approximate payload size
-            try:
-                prompt_len = len(prompt)
-            except Exception:
-                prompt_len = None
-
-            try:
-                payload_size = len(json.dumps(payload))
-            except Exception:
-                payload_size = None
+            # Serialize once: the same bytes are sent and measured for diagnostics
+            body = json_utils.dumps_bytes(payload)
 
-            logger.debug(f"LLM.generate: model={self.model} api_url={self.api_url} prompt_len={prompt_len} payload_size={payload_size} timeout={timeout}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "LLM.generate: model=%s api_url=%s prompt_len=%d payload_size=%d timeout=%s",
+                    self.model, self.api_url, len(prompt), len(body), timeout
+                )
 
             start = time.time()
-            response = requests.post(
+            response = self._session.post(
                 self.api_url,
-                json=payload,
+                data=body,
+                headers=JSON_HEADERS,
                 timeout=timeout
             )
-            duration = time.time() - start
-
-            logger.debug(f"LLM.generate: request completed in {duration:.3f}s status={response.status_code}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "LLM.generate: request completed in %.3fs status=%s",
+                    time.time() - start, response.status_code
+                )
 
             response.raise_for_status()
-            # Try to read raw text first for diagnostics
-            raw_text = response.text
-            try:
-                result = response.json()
-            except ValueError:
-                logger.debug("LLM.generate: response is not valid JSON, returning raw text")
-                # Log truncated response length
-                logger.debug(f"LLM.generate: response_text_len={len(raw_text) if raw_text is not None else 'None'}")
-                return raw_text
-
-            # Log size of JSON response
-            try:
-                resp_size = len(json.dumps(result))
-            except Exception:
-                resp_size = None
-
-            logger.debug(f"LLM.generate: json response size={resp_size}")
-
-            return result.get("response", result)
-        except requests.exceptions.RequestException as e:
+            return self._parse_response(response.content)
+        except RequestException as e:
             logger.error(f"Ollama API error: {e}")
             raise LLMException(f"Failed to generate response: {e}") from e
 
+    def generate_stream(
+            self,
+            prompt: str,
+            json_mode: bool = False,
+            timeout: int = 120
+    ) -> Iterator[str]:
+        """
+        Generate a response from the LLM, yielding text pieces as they arrive.
+
+        Ollama emits newline-delimited JSON objects when streaming; each one
+        carries the next piece of text in its "response" key.
+
+        Args:
+            prompt: Input prompt
+            json_mode: Whether to return JSON format
+            timeout: Request timeout in seconds
+
+        Yields:
+            Generated text pieces, in order
+
+        Raises:
+            LLMException: On API errors
+        """
+        payload = self._build_payload(prompt, json_mode, stream=True)
+        body = json_utils.dumps_bytes(payload)
+
+        try:
+            with self._session.post(
+                self.api_url,
+                data=body,
+                headers=JSON_HEADERS,
+                timeout=timeout,
+                stream=True
+            ) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+
+                    chunk = json_utils.loads(line)
+                    if chunk.get("error"):
+                        raise LLMException(f"Ollama stream error: {chunk['error']}")
+
+                    piece = chunk.get("response")
+                    if piece:
+                        yield piece
+
+                    if chunk.get("done"):
+                        break
+        except RequestException as e:
+            logger.error(f"Ollama API error: {e}")
+            raise LLMException(f"Failed to generate response: {e}") from e
+        except ValueError as e:
+            logger.error(f"Invalid chunk in Ollama stream: {e}")
+            raise LLMException(f"Invalid streamed response: {e}") from e
+
     def generate_json(self, prompt: str, timeout: int = 120) -> Any:
         """
         Generate and parse JSON response.
@@ -159,8 +297,60 @@ class LLM:
             LLMException: On API or JSON parse errors
         """
         response = self.generate(prompt, json_mode=True, timeout=timeout)
+        return self._parse_json_output(response)
+
+    @retry(max_retries=3)
+    def generate_json_streamed(self, prompt: str, timeout: int = 120) -> Any:
+        """
+        Like `generate_json`, but stream the output and stop reading as soon as
+        the top-level JSON object is complete.
+
+        In json mode the model may keep emitting whitespace after the closing
+        brace; closing the stream early spares waiting for it.
+
+        Args:
+            prompt: Input prompt
+            timeout: Request timeout in seconds
+
+        Returns:
+            Parsed JSON object
+
+        Raises:
+            LLMException: On API or JSON parse errors
+        """
+        pieces = []
+        depth = 0
+        in_string = False
+        escaped = False
+        complete = False
+
+        stream = self.generate_stream(prompt, json_mode=True, timeout=timeout)
         try:
-            return json.loads(response)
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse JSON response: {e}")
-            raise LLMException(f"Invalid JSON response: {e}") from e
\ No newline at end of file
+            for piece in stream:
+                pieces.append(piece)
+                for index, char in enumerate(piece):
+                    if in_string:
+                        if escaped:
+                            escaped = False
+                        elif char == "\\":
+                            escaped = True
+                        elif char == '"':
+                            in_string = False
+                    elif char == '"':
+                        in_string = True
+                    elif char in "{[":
+                        depth += 1
+                    elif char in "}]":
+                        depth -= 1
+                        if depth == 0:
+                            # Drop anything the model emitted after the closing brace
+                            pieces[-1] = piece[:index + 1]
+                            complete = True
+                            break
+                if complete:
+                    break
+        finally:
+            # Closing the generator closes the HTTP response, so Ollama stops generating
+            stream.close()
+
+        return self._parse_json_output("".join(pieces))
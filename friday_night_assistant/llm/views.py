@@ -1,8 +1,9 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from django.conf import settings
-from ollama import Client
+from django.http import StreamingHttpResponse
+
+from .client import get_ollama_client
 
 class OllamaQueryView(APIView):
     def post(self, request):
@@ -11,8 +12,18 @@ class OllamaQueryView(APIView):
             return Response({'error': 'Prompt required'}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            client = Client(host=settings.OLLAMA_FULL_HOST)
-            response = client.chat(model="gemma3", messages=[{"role": "user", "content": prompt}])
+            client = get_ollama_client()
+            messages = [{"role": "user", "content": prompt}]
+
+            if request.data.get('stream'):
+                # Forward tokens to the HTTP client as soon as Ollama produces them
+                chunks = client.chat(model="gemma3", messages=messages, stream=True)
+                return StreamingHttpResponse(
+                    (chunk['message']['content'] for chunk in chunks),
+                    content_type='text/plain; charset=utf-8'
+                )
+
+            response = client.chat(model="gemma3", messages=messages)
             return Response({'response': response.message.content})
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
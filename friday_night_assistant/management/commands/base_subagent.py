@@ -1,37 +1,113 @@
 """Base class for sub-agents with shared functionality."""
 
-from typing import Dict, Any, List, Optional
-import json
-import time
+from functools import lru_cache
+from typing import Callable, ClassVar, Dict, Any, List, Optional, Tuple
+import hashlib
+import logging
+import queue
+import threading
+import traceback
+from django.conf import settings
+from django.core.cache import cache
 from django.core.management.base import BaseCommand
 
+from friday_night_assistant import json_utils
+from friday_night_assistant.agent_common import AgentMemoryMixin, ParameterConversionMixin
 from friday_night_assistant.llm.llm import LLM, LLMException
 from friday_night_assistant.models.mysql_models.models import AgentMemory
 
+logger = logging.getLogger(__name__)
 
-class BaseSubAgent(BaseCommand):
+
+@lru_cache(maxsize=None)
+def _methods_json(plugin_class) -> str:
+    """Specifica dei metodi di un plugin serializzata per il prompt, una volta sola per classe.
+
+    Ogni delega crea un nuovo sotto-agente: senza cache la stessa specifica
+    (memoizzata dal plugin) verrebbe riserializzata a ogni delega.
+    """
+    return json_utils.dumps(plugin_class.get_available_methods(), indent=True)
+
+
+class _BackgroundOutput:
+    """Inoltra le write a un OutputWrapper da un thread dedicato, nello stesso ordine in cui arrivano."""
+
+    def __init__(self, out):
+        self._out = out
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._drain, daemon=True)
+        self._thread.start()
+
+    def write(self, msg='', style_func=None, ending=None):
+        self._queue.put((msg, style_func, ending))
+
+    def flush(self):
+        """Attende che tutte le write accodate siano state eseguite."""
+        self._queue.join()
+
+    def write_now(self, msg='', style_func=None, ending=None):
+        """Scrive subito, senza passare dal thread, dopo aver svuotato la coda (l'ordine resta invariato)."""
+        self.flush()
+        self._out.write(msg, style_func, ending)
+        self._out.flush()
+
+    def close(self):
+        """Svuota la coda e ferma il thread."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _drain(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                msg, style_func, ending = item
+                self._out.write(msg, style_func, ending)
+                self._out.flush()
+            except Exception:
+                logger.exception("Scrittura dell'output in background fallita")
+            finally:
+                self._queue.task_done()
+
+    def __getattr__(self, name):
+        return getattr(self._out, name)
+
+
+class BaseSubAgent(AgentMemoryMixin, ParameterConversionMixin, BaseCommand):
     """Base class for specialized sub-agents."""
 
     # Override these in subclasses
     AGENT_TYPE = "base"  # e.g., 'post', 'tutorial'
     AGENT_NAME = "BaseAgent"
 
+    # Condiviso tra tutte le esecuzioni dei sotto-agenti nel processo: il main agent ne crea
+    # una nuova istanza a ogni delega
+    _shared_llm: ClassVar[Optional[LLM]] = None
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.agent_plugins: Optional[Any] = None
         self.llm: Optional[LLM] = None
         self.method_dict: Dict[str, Dict[str, Any]] = {}
+        self._method_callables: Dict[str, Callable[..., Any]] = {}
+        # Come --verbosity del main agent, che la passa a ogni delega
+        self.verbosity = 1
+        self._methods_json = ""
+        self._prompt_prefix = ""
+        self._prompt_suffix = ""
 
     # ========== MEMORY MANAGEMENT (agent-specific) ==========
 
-    def _get_previous_memories(self) -> List[Dict[str, Any]]:
-        """Recupera le memorie precedenti per questo specifico agente."""
-        return list(
+    def _get_previous_memories(self, after_id: int = 0) -> List[Tuple[int, Dict[str, Any]]]:
+        """Recupera le ultime MEMORY_WINDOW memorie di questo agente successive ad `after_id`, in ordine cronologico."""
+        recent = (
             AgentMemory.objects
-            .filter(agent_type=self.AGENT_TYPE)
-            .order_by('created_at')
-            .values_list('value', flat=True)
+            .filter(agent_type=self.AGENT_TYPE, id__gt=after_id)
+            .order_by('-id')
+            .values_list('id', 'value')[:self.MEMORY_WINDOW]
         )
+        return list(reversed(recent))
 
     def _save_decision_to_memory(self, decision: Dict[str, Any]) -> AgentMemory:
         """Salva una decisione nella memoria di questo agente."""
@@ -42,172 +118,68 @@ class BaseSubAgent(BaseCommand):
 
     def _clear_agent_memory(self) -> int:
         """Pulisce la memoria di questo agente."""
-        count = AgentMemory.objects.filter(agent_type=self.AGENT_TYPE).count()
-        AgentMemory.objects.filter(agent_type=self.AGENT_TYPE).delete()
+        count, _ = AgentMemory.objects.filter(agent_type=self.AGENT_TYPE).delete()
+        self._memory_blocks.clear()
+        self._memory_count = 0
+        self._invalidate_decision_cache()
         return count
 
-    def _update_memory_with_result(self, memory_record: AgentMemory, result: Any) -> None:
-        """Aggiorna un record di memoria con il risultato dell'esecuzione."""
-        updated_value = memory_record.value.copy()
-        updated_value['result'] = result
-        memory_record.value = updated_value
-        memory_record.save()
-
     # ========== MEMORY FORMATTING ==========
 
-    def _format_memory_section(self, memories: List[Dict[str, Any]]) -> str:
-        """Formatta le memorie in una stringa leggibile."""
-        if not memories:
+    def _format_memory_section(self) -> str:
+        """Formatta le memorie in cache in una stringa leggibile."""
+        if not self._memory_blocks:
             return ""
 
-        memory_lines = [f"Azioni già eseguite da {self.AGENT_NAME}:"]
-
-        for idx, mem in enumerate(memories, 1):
-            memory_lines.extend(self._format_single_memory(idx, mem))
-
-        memory_lines.append(
-            f"\nIn base a queste azioni già eseguite e ai loro risultati, decidi cosa fare adesso."
+        return (
+            f"\nAzioni già eseguite da {self.AGENT_NAME}:\n"
+            + "\n".join(self._memory_blocks)
+            + "\n\nIn base a queste azioni già eseguite e ai loro risultati, decidi cosa fare adesso.\n"
         )
-        return "\n" + "\n".join(memory_lines) + "\n"
-
-    def _format_single_memory(self, idx: int, memory: Dict[str, Any]) -> List[str]:
-        """Formatta una singola memoria."""
-        action = memory.get('action', 'N/A')
-        args = memory.get('args', {})
-        reason = memory.get('reason', 'N/A')
-        result = memory.get('result')
-
-        lines = [
-            f"\n{idx}. Azione: {action}",
-            f"   Parametri: {json.dumps(args, ensure_ascii=False)}",
-            f"   Motivazione: {reason}"
-        ]
-
-        if result is not None:
-            result_line = self._format_memory_result(result)
-            lines.append(result_line)
-        else:
-            lines.append("   ⏳ Risultato: In attesa...")
-
-        return lines
-
-    def _format_memory_result(self, result: Any) -> str:
-        """Formatta il risultato di una memoria."""
-        if isinstance(result, dict) and result.get('error'):
-            return f"   ❌ Risultato: ERRORE - {result['error']}"
-        else:
-            return f"   ✓ Risultato ottenuto: {json.dumps(result, ensure_ascii=False, default=str)}"
-
-    # ========== PARAMETER CONVERSION ==========
-
-    def _convert_parameter_types(self, args: Dict[str, Any], method_spec: Dict[str, Any]) -> Dict[str, Any]:
-        """Converte i parametri ai tipi corretti basandosi sulla specifica del metodo."""
-        converted_args = {}
-        parameters_spec = method_spec.get('parameters', {})
-
-        for param_name, param_value in args.items():
-            if param_name not in parameters_spec:
-                self._log_parameter_warning(param_name, "non trovato nella specifica")
-                converted_args[param_name] = param_value
-                continue
-
-            param_type = parameters_spec[param_name].get('type', 'str')
-            converted_args[param_name] = self._convert_single_parameter(
-                param_name, param_value, param_type
-            )
-
-        return converted_args
-
-    def _convert_single_parameter(self, param_name: str, param_value: Any, param_type: str) -> Any:
-        """Converte un singolo parametro al tipo specificato."""
-        try:
-            if param_value is None:
-                return None
-            elif param_type == 'int':
-                return int(param_value)
-            elif param_type == 'float':
-                return float(param_value)
-            elif param_type == 'bool':
-                return self._convert_to_bool(param_value)
-            elif param_type == 'list':
-                return self._convert_to_list(param_value)
-            elif param_type == 'dict':
-                return self._convert_to_dict(param_name, param_value)
-            else:
-                return str(param_value)
-
-        except (ValueError, TypeError, json.JSONDecodeError) as e:
-            self._log_conversion_error(param_name, param_value, param_type, e)
-            return param_value
-
-    def _convert_to_bool(self, value: Any) -> bool:
-        """Converte un valore a boolean."""
-        if isinstance(value, str):
-            return value.lower() in ('true', '1', 'yes')
-        return bool(value)
-
-    def _convert_to_list(self, value: Any) -> List:
-        """Converte un valore a lista."""
-        if isinstance(value, str):
-            try:
-                return json.loads(value)
-            except json.JSONDecodeError:
-                return [item.strip() for item in value.split(',')]
-        elif isinstance(value, list):
-            return value
-        else:
-            return [value]
-
-    def _convert_to_dict(self, param_name: str, value: Any) -> Dict:
-        """Converte un valore a dizionario."""
-        if isinstance(value, str):
-            return json.loads(value)
-        elif isinstance(value, dict):
-            return value
-        else:
-            self._log_parameter_warning(param_name, "impossibile convertire a dict")
-            return value
 
     # ========== PROMPT BUILDING ==========
 
-    def _build_prompt(self, methods: List[Dict], state: Any, memory_section: str, context: Dict[str, Any]) -> str:
-        """Costruisce il prompt per l'LLM. Override this in subclasses for custom prompts."""
-        prompt_base = f"""Sei {self.AGENT_NAME}, un assistente specializzato.
+    def _build_prompt_prefix(self, context: Dict[str, Any]) -> str:
+        """Parte iniziale del prompt, fissa per tutta l'esecuzione. Override this in subclasses for custom prompts."""
+        return f"""Sei {self.AGENT_NAME}, un assistente specializzato.
 
 Contesto:
-{json.dumps(context, ensure_ascii=False, indent=2)}
+{json_utils.dumps(context, indent=True)}
 
 Hai questi metodi disponibili:
-{{methods}}
-
-Stato corrente:
-{{state}}"""
-
-        if memory_section:
-            prompt_base += "\n{memory}"
-
-        prompt_base += """
+{self._methods_json}
+"""
 
+    def _build_prompt_suffix(self) -> str:
+        """Istruzioni finali del prompt, fisse per tutta l'esecuzione. Override this in subclasses for custom prompts."""
+        return """
 Sei AUTONOMO: devi decidere tu quali azioni eseguire per completare il tuo compito.
 Analizza la situazione e pianifica una serie di azioni.
 
 Decidi quale metodo chiamare e con quali parametri.
 Rispondi SOLO con JSON in questo formato:
-{{
+{
   "action": "nome_metodo",
-  "args": {{parametri}},
+  "args": {parametri},
   "reason": "perché hai scelto questo",
   "stop": false
-}}
+}
 
 Quando hai completato TUTTE le azioni necessarie, imposta "stop": true per restituire il controllo all'agent principale.
 """
 
-        return prompt_base.format(
-            methods=json.dumps(methods, ensure_ascii=False, indent=2),
-            state=json.dumps(state, ensure_ascii=False, indent=2),
-            memory=memory_section
-        )
+    def _prepare_prompt(self, context: Dict[str, Any]) -> None:
+        """Precalcola le parti del prompt che non cambiano tra un'iterazione e l'altra."""
+        self._methods_json = _methods_json(type(self.agent_plugins))
+        self._prompt_prefix = self._build_prompt_prefix(context)
+        self._prompt_suffix = self._build_prompt_suffix()
+
+    def _build_prompt(self, state: Any, memory_section: str) -> str:
+        """Costruisce il prompt per l'LLM a partire dalle parti precalcolate in `_prepare_prompt`."""
+        # La memoria cresce solo in coda: tenerla prima dello stato (che cambia a ogni
+        # iterazione) lascia invariato il prefisso del prompt e ne permette il riuso in cache
+        state_json = json_utils.dumps(state, indent=True, default=str)
+        return f"{self._prompt_prefix}{memory_section}\nStato corrente:\n{state_json}\n{self._prompt_suffix}"
 
     # ========== LLM INTERACTION ==========
 
@@ -216,22 +188,52 @@ Quando hai completato TUTTE le azioni necessarie, imposta "stop": true per resti
         self._log_prompt(prompt)
         self.stdout.write(self.style.NOTICE(f'{self.AGENT_NAME}: Chiedo a LLM di decidere...'))
 
-        decision = self.llm.generate_json(prompt, timeout=180)
+        decision = self._cached_generate_json(prompt)
 
         if not isinstance(decision, dict):
             raise LLMException("Decisione non è dict")
 
         return decision
 
+    # ========== DECISION CACHE ==========
+
+    def _decision_cache_key(self, prompt: str) -> str:
+        """Chiave di cache per un prompt, legata alla generazione corrente della memoria dell'agente."""
+        generation = cache.get(f'agent_decision:{self.AGENT_TYPE}:generation', 0)
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        return f'agent_decision:{self.AGENT_TYPE}:{generation}:{digest}'
+
+    def _cached_generate_json(self, prompt: str) -> Any:
+        """Riusa la decisione già ottenuta per un prompt identico, altrimenti interroga l'LLM."""
+        ttl = settings.AGENT_DECISION_CACHE_TTL
+        if ttl <= 0:
+            return self.llm.generate_json_streamed(prompt, timeout=180)
+
+        key = self._decision_cache_key(prompt)
+        decision = cache.get(key)
+        if decision is not None:
+            self.stdout.write(self.style.NOTICE(f'{self.AGENT_NAME}: Decisione trovata in cache'))
+            return decision
+
+        decision = self.llm.generate_json_streamed(prompt, timeout=180)
+        cache.set(key, decision, ttl)
+        return decision
+
+    def _invalidate_decision_cache(self) -> None:
+        """Invalida tutte le decisioni in cache per questo agente cambiando generazione."""
+        key = f'agent_decision:{self.AGENT_TYPE}:generation'
+        cache.add(key, 0, None)
+        cache.incr(key)
+
     def _handle_llm_error(self, prompt: str, error: LLMException) -> None:
         """Gestisce un errore dell'LLM tentando una risposta raw."""
-        self.stdout.write(self.style.ERROR(f'\n✗ {self.AGENT_NAME} - Errore LLM: {error}'))
+        self._write_error(f'\n✗ {self.AGENT_NAME} - Errore LLM: {error}')
         try:
             raw = self.llm.generate(prompt, json_mode=False, timeout=180)
             self.stdout.write(self.style.WARNING('Risposta raw:'))
             self.stdout.write(raw)
         except Exception as e2:
-            self.stdout.write(self.style.ERROR(f'Fallito anche raw: {e2}'))
+            self._write_error(f'Fallito anche raw: {e2}')
 
     # ========== ACTION EXECUTION ==========
 
@@ -244,7 +246,7 @@ Quando hai completato TUTTE le azioni necessarie, imposta "stop": true per resti
         """Esegue un'azione e gestisce il risultato."""
         if action not in self.method_dict:
             error_state = {"error": f"Metodo {action} non trovato"}
-            self.stdout.write(self.style.ERROR(f'{self.AGENT_NAME}: Metodo {action} non trovato'))
+            self._write_error(f'{self.AGENT_NAME}: Metodo {action} non trovato')
             self._update_memory_with_result(memory_record, error_state)
             return error_state
 
@@ -252,7 +254,7 @@ Quando hai completato TUTTE le azioni necessarie, imposta "stop": true per resti
             state = self._execute_method(action, args)
             self.stdout.write(
                 self.style.SUCCESS(
-                    f'{self.AGENT_NAME}: Output metodo: {json.dumps(state, ensure_ascii=False, default=str)}'
+                    f'{self.AGENT_NAME}: Output metodo: {json_utils.dumps(state, default=str)}'
                 )
             )
             self._update_memory_with_result(memory_record, state)
@@ -269,27 +271,35 @@ Quando hai completato TUTTE le azioni necessarie, imposta "stop": true per resti
         method_spec = self.method_dict[action]
         converted_args = self._convert_parameter_types(args, method_spec)
 
-        self._log_converted_args(converted_args)
+        if self.verbosity >= 2:
+            self._log_converted_args(converted_args)
 
-        return getattr(self.agent_plugins, action)(**converted_args)
+        return self._method_callables[action](**converted_args)
 
     # ========== LOGGING ==========
 
+    def _write_error(self, msg: str) -> None:
+        """Scrive un errore in modo sincrono, anche mentre l'output passa dal thread in background."""
+        styled = self.style.ERROR(msg)
+        if isinstance(self.stdout, _BackgroundOutput):
+            self.stdout.write_now(styled)
+        else:
+            self.stdout.write(styled)
+
     def _log_prompt(self, prompt: str) -> None:
         """Logga il prompt inviato all'LLM."""
-        self.stdout.write(self.style.MIGRATE_HEADING('\n' + '=' * 80))
-        self.stdout.write(self.style.MIGRATE_HEADING(f'PROMPT INVIATO AL LLM ({self.AGENT_NAME}):'))
-        self.stdout.write(self.style.MIGRATE_HEADING('=' * 80))
-        self.stdout.write(prompt)
-        self.stdout.write(self.style.MIGRATE_HEADING('=' * 80 + '\n'))
+        bar = '=' * 80
+        header = self.style.MIGRATE_HEADING(f'\n{bar}\nPROMPT INVIATO AL LLM ({self.AGENT_NAME}):\n{bar}')
+        footer = self.style.MIGRATE_HEADING(f'{bar}\n')
+        self.stdout.write(f'{header}\n{prompt}\n{footer}')
 
     def _log_decision(self, action: str, args: Dict[str, Any], reason: str) -> None:
         """Logga la decisione presa dall'LLM."""
-        self.stdout.write(self.style.WARNING(f'\n{self.AGENT_NAME}: Metodo scelto: {action}'))
-        self.stdout.write(
-            self.style.WARNING(f'{self.AGENT_NAME}: Parametri: {json.dumps(args, ensure_ascii=False)}')
-        )
-        self.stdout.write(self.style.WARNING(f'{self.AGENT_NAME}: Motivazione: {reason}'))
+        self.stdout.write(self.style.WARNING(
+            f'\n{self.AGENT_NAME}: Metodo scelto: {action}\n'
+            f'{self.AGENT_NAME}: Parametri: {json_utils.dumps(args)}\n'
+            f'{self.AGENT_NAME}: Motivazione: {reason}'
+        ))
 
     def _log_converted_args(self, converted_args: Dict[str, Any]) -> None:
         """Logga gli argomenti convertiti."""
@@ -316,22 +326,28 @@ Quando hai completato TUTTE le azioni necessarie, imposta "stop": true per resti
         )
 
     def _log_execution_error(self, action: str, error: Exception) -> None:
-        """Logga un errore di esecuzione."""
-        import traceback
-        self.stdout.write(self.style.ERROR(f'{self.AGENT_NAME}: Errore eseguendo {action}: {error}'))
-        self.stdout.write(self.style.ERROR(traceback.format_exc()))
+        """Logga un errore di esecuzione (con traceback completo solo con --verbosity 2 o superiore)."""
+        details = f'\n{traceback.format_exc()}' if self.verbosity >= 2 else ''
+        self._write_error(
+            f'{self.AGENT_NAME}: Errore eseguendo {action}: {error.__class__.__name__}: {error}{details}'
+        )
 
     # ========== MAIN LOOP ==========
 
-    def _process_decision_loop(self, methods: List[Dict], state: Any, context: Dict[str, Any]) -> None:
-        """Processa il loop principale di decisione."""
+    def _process_decision_loop(self, state: Any) -> Optional[Dict[str, Any]]:
+        """Processa il loop principale di decisione.
+
+        Returns:
+            L'ultima decisione eseguita in questa esecuzione, con il relativo 'result', o None
+        """
+        last_memory = None
         while True:
             # Recupera e formatta la memoria
-            previous_memories = self._get_previous_memories()
-            memory_section = self._format_memory_section(previous_memories)
+            self._refresh_memory()
+            memory_section = self._format_memory_section()
 
             # Costruisci il prompt
-            prompt = self._build_prompt(methods, state, memory_section, context)
+            prompt = self._build_prompt(state, memory_section)
 
             try:
                 # Ottieni decisione dall'LLM
@@ -354,29 +370,48 @@ Quando hai completato TUTTE le azioni necessarie, imposta "stop": true per resti
 
                 # Esegui l'azione
                 state = self._execute_action(action, args, memory_record)
-
-                time.sleep(1)
+                last_memory = {**decision, 'result': state}
 
             except LLMException as e:
                 self._handle_llm_error(prompt, e)
                 break
 
-    def run_agent(self, context: Dict[str, Any]) -> None:
-        """Entry point per eseguire il sotto-agente con un contesto specifico."""
+        return last_memory
+
+    def run_agent(self, context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Entry point per eseguire il sotto-agente con un contesto specifico.
+
+        Returns:
+            L'ultima decisione eseguita, con il relativo 'result', o None se non ne è stata eseguita nessuna
+        """
         self.stdout.write(self.style.MIGRATE_HEADING(f'Avvio {self.AGENT_NAME}'))
 
-        # Inizializza LLM
-        self.llm = LLM()
+        # Inizializza LLM (un solo client, e quindi un solo pool di connessioni, per tutti i sotto-agenti)
+        if BaseSubAgent._shared_llm is None:
+            BaseSubAgent._shared_llm = LLM()
+        self.llm = BaseSubAgent._shared_llm
 
-        # Ottieni metodi disponibili
+        # Ottieni metodi disponibili (la specifica è memoizzata dal plugin)
         methods = self.agent_plugins.get_available_methods()
         self.method_dict = {m['name']: m for m in methods}
+        # Metodi già risolti una volta sola, invece di un getattr a ogni azione
+        self._method_callables = {name: getattr(self.agent_plugins, name) for name in self.method_dict}
+        self._prepare_prompt(context)
 
         # Stato iniziale
         state = None
 
-        # Esegui il loop principale
-        self._process_decision_loop(methods, state, context)
+        # Durante il loop l'output viene scritto da un thread separato, così il logging
+        # (prompt compresi) non blocca la chiamata successiva all'LLM
+        output = self.stdout
+        self.stdout = _BackgroundOutput(output)
+        try:
+            # Esegui il loop principale
+            last_memory = self._process_decision_loop(state)
+        finally:
+            self.stdout.close()
+            self.stdout = output
 
         self.stdout.write(self.style.MIGRATE_HEADING(f'\n{self.AGENT_NAME} completato'))
+        return last_memory
 
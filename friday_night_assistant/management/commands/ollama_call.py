@@ -1,30 +1,82 @@
-from django.core.management.base import BaseCommand
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
 
-from ollama import Client
+from friday_night_assistant.llm.client import get_ollama_client
+
+# Lo streaming accumula i token e scrive su stdout ogni ~4 KB o ogni 50 ms
+FLUSH_CHARS = 4096
+FLUSH_INTERVAL = 0.05
 
 
 class Command(BaseCommand):
-    help = 'Call Ollama model with a prompt'
+    help = 'Call Ollama model with one or more prompts'
 
     def add_arguments(self, parser):
-        parser.add_argument('prompt', type=str, help='The prompt to send to the model')
+        parser.add_argument('prompt', nargs='*', type=str, help='The prompt(s) to send to the model')
+        parser.add_argument('--jsonl', type=str, help='File JSONL con un prompt per riga (stringa o {"prompt": ...})')
+        parser.add_argument('--no-stream', action='store_true', help='Attende la risposta completa invece dello streaming')
+
+    def _read_jsonl_prompts(self, path):
+        """Legge i prompt da un file JSONL, una voce per riga."""
+        with open(path, encoding='utf-8') as fh:
+            for line in fh:
+                line = line.strip()
+                if not line:
+                    continue
+                item = json.loads(line)
+                yield item['prompt'] if isinstance(item, dict) else str(item)
 
     def handle(self, *args, **options):
-        client = Client(host=settings.OLLAMA_FULL_HOST)
-
-        # Aggiungi stream=True
-        response = client.chat(
-            model="gemma3",
-            messages=[{"role": "user", "content": options['prompt']}],
-            stream=True
-        )
-
-        # Itera sui chunk della risposta
-        for chunk in response:
-            # Scrivi ogni chunk senza andare a capo
-            self.stdout.write(chunk['message']['content'], ending='')
-            self.stdout.flush()  # Forza l'output immediato
-
-        # Vai a capo alla fine
-        self.stdout.write('')
\ No newline at end of file
+        prompts = list(options['prompt'])
+        if options['jsonl']:
+            prompts.extend(self._read_jsonl_prompts(options['jsonl']))
+        if not prompts:
+            raise CommandError('Specifica almeno un prompt o --jsonl')
+
+        # Un solo client per tutti i prompt: la connessione viene riusata
+        client = get_ollama_client()
+
+        for prompt in prompts:
+            messages = [{"role": "user", "content": prompt}]
+
+            if options['no_stream']:
+                response = client.chat(model="gemma3", messages=messages, keep_alive=settings.OLLAMA_KEEP_ALIVE)
+                self.stdout.write(response.message.content)
+                continue
+
+            response = client.chat(
+                model="gemma3",
+                messages=messages,
+                stream=True,
+                keep_alive=settings.OLLAMA_KEEP_ALIVE
+            )
+            self._write_stream(response)
+
+            # Vai a capo alla fine
+            self.stdout.write('')
+
+    def _write_stream(self, chunks):
+        """Scrive i chunk in streaming raggruppandoli, invece di una write+flush per token."""
+        buffer = []
+        buffered = 0
+        last_flush = time.monotonic()
+
+        for chunk in chunks:
+            piece = chunk['message']['content']
+            buffer.append(piece)
+            buffered += len(piece)
+
+            now = time.monotonic()
+            if buffered >= FLUSH_CHARS or now - last_flush >= FLUSH_INTERVAL:
+                self.stdout.write(''.join(buffer), ending='')
+                self.stdout.flush()
+                buffer.clear()
+                buffered = 0
+                last_flush = now
+
+        if buffer:
+            self.stdout.write(''.join(buffer), ending='')
+            self.stdout.flush()
@@ -1,8 +1,15 @@
+import random
+
 from django.core.management.base import BaseCommand
+from django.db.models import Max, Min
 from django.db.models.functions import Random
 
 from friday_night_assistant.models.pg_models.models import Post
 
+# Quanti id candidati estrarre per ogni post richiesto (compensa i buchi nella sequenza)
+CANDIDATE_FACTOR = 2
+POST_FIELDS = ('id', 'title', 'status', 'counter')
+
 
 class Command(BaseCommand):
     help = "Stampa N post casuali dal DB Postgres (default 2)."
@@ -15,13 +22,35 @@ class Command(BaseCommand):
             return t.get('en') or next(iter(t.values()), '')
         return str(t)
 
+    def _sample_posts(self, n):
+        """
+        Estrae n post casuali con lookup sulla primary key invece di ORDER BY RANDOM(),
+        che ordinerebbe l'intera tabella. Se gli id sono troppo radi per trovare
+        abbastanza righe, completa il campione con order_by(Random()).
+        """
+        posts = Post.objects.using('postgres').only(*POST_FIELDS)
+        bounds = posts.aggregate(lo=Min('id'), hi=Max('id'))
+        if bounds['lo'] is None:
+            return []
+
+        id_range = range(bounds['lo'], bounds['hi'] + 1)
+        candidates = random.sample(id_range, min(n * CANDIDATE_FACTOR, len(id_range)))
+        sample = list(posts.filter(id__in=candidates))
+        random.shuffle(sample)
+        sample = sample[:n]
+
+        missing = n - len(sample)
+        if missing > 0:
+            found_ids = [p.id for p in sample]
+            sample.extend(posts.exclude(id__in=found_ids).order_by(Random())[:missing])
+        return sample
+
     def handle(self, *args, **options):
         n = options['n']
-        qs = Post.objects.using('postgres').order_by(Random())[:n]
+        qs = self._sample_posts(n) if n > 0 else []
         if not qs:
             self.stdout.write(self.style.WARNING('Nessun post trovato sul DB postgres.'))
             return
         for p in qs:
             title = self._title_str(p.title)
             self.stdout.write(f"{p.id}\t{title}\t{p.status}\t{p.counter}")
-
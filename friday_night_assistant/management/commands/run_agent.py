@@ -1,14 +1,15 @@
 from django.core.management.base import BaseCommand
-import json
-import time
-from typing import Dict, Any, List, Optional
+import traceback
+from typing import Callable, Dict, Any, Iterable, List, Optional, Tuple
 
 from friday_night_assistant.plugins import AgentPlugins
+from friday_night_assistant import json_utils
+from friday_night_assistant.agent_common import AgentMemoryMixin, ParameterConversionMixin
 from friday_night_assistant.llm.llm import LLM, LLMException
 from friday_night_assistant.models.mysql_models.models import AgentMemory
 
 
-class Command(BaseCommand):
+class Command(AgentMemoryMixin, ParameterConversionMixin, BaseCommand):
     help = "Loop decisione-esecuzione LLM agente"
 
     def __init__(self, *args, **kwargs):
@@ -16,172 +17,71 @@ class Command(BaseCommand):
         self.agent: Optional[AgentPlugins] = None
         self.llm: Optional[LLM] = None
         self.method_dict: Dict[str, Dict[str, Any]] = {}
-
-    # ========== PARAMETER CONVERSION ==========
-
-    def _convert_parameter_types(self, args: Dict[str, Any], method_spec: Dict[str, Any]) -> Dict[str, Any]:
-        """Converte i parametri ai tipi corretti basandosi sulla specifica del metodo."""
-        converted_args = {}
-        parameters_spec = method_spec.get('parameters', {})
-
-        for param_name, param_value in args.items():
-            if param_name not in parameters_spec:
-                self._log_parameter_warning(param_name, "non trovato nella specifica")
-                converted_args[param_name] = param_value
-                continue
-
-            param_type = parameters_spec[param_name].get('type', 'str')
-            converted_args[param_name] = self._convert_single_parameter(
-                param_name, param_value, param_type
-            )
-
-        return converted_args
-
-    def _convert_single_parameter(self, param_name: str, param_value: Any, param_type: str) -> Any:
-        """Converte un singolo parametro al tipo specificato."""
-        try:
-            if param_value is None:
-                return None
-            elif param_type == 'int':
-                return int(param_value)
-            elif param_type == 'float':
-                return float(param_value)
-            elif param_type == 'bool':
-                return self._convert_to_bool(param_value)
-            elif param_type == 'list':
-                return self._convert_to_list(param_value)
-            elif param_type == 'dict':
-                return self._convert_to_dict(param_name, param_value)
-            else:
-                return str(param_value)
-
-        except (ValueError, TypeError, json.JSONDecodeError) as e:
-            self._log_conversion_error(param_name, param_value, param_type, e)
-            return param_value
-
-    def _convert_to_bool(self, value: Any) -> bool:
-        """Converte un valore a boolean."""
-        if isinstance(value, str):
-            return value.lower() in ('true', '1', 'yes')
-        return bool(value)
-
-    def _convert_to_list(self, value: Any) -> List:
-        """Converte un valore a lista."""
-        if isinstance(value, str):
-            try:
-                return json.loads(value)
-            except json.JSONDecodeError:
-                return [item.strip() for item in value.split(',')]
-        elif isinstance(value, list):
-            return value
-        else:
-            return [value]
-
-    def _convert_to_dict(self, param_name: str, value: Any) -> Dict:
-        """Converte un valore a dizionario."""
-        if isinstance(value, str):
-            return json.loads(value)
-        elif isinstance(value, dict):
-            return value
-        else:
-            self._log_parameter_warning(param_name, "impossibile convertire a dict")
-            return value
+        self._method_callables: Dict[str, Callable[..., Any]] = {}
+        self.verbosity = 1
+        self._prompt_prefix = ""
+        self._prompt_suffix = ""
 
     # ========== MEMORY MANAGEMENT ==========
 
-    def _get_previous_memories(self) -> List[Dict[str, Any]]:
-        """Recupera le memorie precedenti dal database."""
-        return list(AgentMemory.objects.order_by('created_at').values_list('value', flat=True))
+    def _get_previous_memories(self, after_id: int = 0) -> Iterable[Tuple[int, Dict[str, Any]]]:
+        """Recupera le memorie con id successivo ad `after_id`, al massimo le ultime MEMORY_WINDOW."""
+        recent = (
+            AgentMemory.objects
+            .filter(id__gt=after_id)
+            .order_by('-id')
+            .values_list('id', 'value')[:self.MEMORY_WINDOW]
+        )
+        return reversed(list(recent))
 
-    def _format_memory_section(self, memories: List[Dict[str, Any]]) -> str:
-        """Formatta le memorie in una stringa leggibile."""
-        if not memories:
+    def _format_memory_section(self) -> str:
+        """Formatta le memorie in cache in una stringa leggibile."""
+        if not self._memory_blocks:
             return ""
 
-        memory_lines = ["Azioni già eseguite:"]
-
-        for idx, mem in enumerate(memories, 1):
-            memory_lines.extend(self._format_single_memory(idx, mem))
-
-        memory_lines.append(
-            "\nIn base a queste azioni già eseguite e ai loro risultati, decidi cosa fare adesso."
+        return (
+            "\nAzioni già eseguite:\n"
+            + "\n".join(self._memory_blocks)
+            + "\n\nIn base a queste azioni già eseguite e ai loro risultati, decidi cosa fare adesso.\n"
         )
-        return "\n" + "\n".join(memory_lines) + "\n"
-
-    def _format_single_memory(self, idx: int, memory: Dict[str, Any]) -> List[str]:
-        """Formatta una singola memoria."""
-        action = memory.get('action', 'N/A')
-        args = memory.get('args', {})
-        reason = memory.get('reason', 'N/A')
-        result = memory.get('result')
-
-        lines = [
-            f"\n{idx}. Azione: {action}",
-            f"   Parametri: {json.dumps(args, ensure_ascii=False)}",
-            f"   Motivazione: {reason}"
-        ]
-
-        if result is not None:
-            result_line = self._format_memory_result(result)
-            lines.append(result_line)
-        else:
-            lines.append("   ⏳ Risultato: In attesa...")
-
-        return lines
-
-    def _format_memory_result(self, result: Any) -> str:
-        """Formatta il risultato di una memoria."""
-        if isinstance(result, dict) and result.get('error'):
-            return f"   ❌ Risultato: ERRORE - {result['error']}"
-        else:
-            return f"   ✓ Risultato ottenuto: {json.dumps(result, ensure_ascii=False, default=str)}"
 
     def _save_decision_to_memory(self, decision: Dict[str, Any]) -> AgentMemory:
         """Salva una decisione nella memoria dell'agente."""
         return AgentMemory.objects.create(value=decision)
 
-    def _update_memory_with_result(self, memory_record: AgentMemory, result: Any) -> None:
-        """Aggiorna un record di memoria con il risultato dell'esecuzione."""
-        updated_value = memory_record.value.copy()
-        updated_value['result'] = result
-        memory_record.value = updated_value
-        memory_record.save()
-
     # ========== PROMPT BUILDING ==========
 
-    def _build_prompt(self, methods: List[Dict], state: Any, memory_section: str) -> str:
-        """Costruisce il prompt per l'LLM."""
-        prompt_base = """Sei un assistente che gestisce un sistema di contenuti web. I siti nel sistema hanno id 1, 2 e 3.
+    def _prepare_prompt(self, methods: List[Dict]) -> None:
+        """Precalcola le parti fisse del prompt: i metodi non cambiano durante il loop."""
+        self._prompt_prefix = f"""Sei un assistente che gestisce un sistema di contenuti web. I siti nel sistema hanno id 1, 2 e 3.
         
         I contenuti dei siti sono di tipo blog e tutorial.
 
 Hai questi metodi disponibili:
-{methods}
+{json_utils.dumps(methods, indent=True)}
 
 Stato corrente:
-{state}"""
-
-        if memory_section:
-            prompt_base += "\n{memory}"
-
-        prompt_base += """
+"""
+        self._prompt_suffix = """
 
 Decidi quale metodo chiamare e con quali parametri.
 Rispondi SOLO con JSON in questo formato:
-{{
+{
   "action": "nome_metodo",
-  "args": {{parametri}},
+  "args": {parametri},
   "reason": "perché hai scelto questo",
   "stop": false
-}}
+}
 Se vuoi fermarti, imposta "stop": true
 """
 
-        return prompt_base.format(
-            methods=json.dumps(methods, ensure_ascii=False, indent=2),
-            state=json.dumps(state, ensure_ascii=False, indent=2),
-            memory=memory_section
-        )
+    def _build_prompt(self, state: Any, memory_section: str) -> str:
+        """Costruisce il prompt per l'LLM a partire dalle parti precalcolate in `_prepare_prompt`."""
+        parts = [self._prompt_prefix, json_utils.dumps(state, indent=True)]
+        if memory_section:
+            parts.append("\n" + memory_section)
+        parts.append(self._prompt_suffix)
+        return "".join(parts)
 
     # ========== LLM INTERACTION ==========
 
@@ -190,7 +90,7 @@ Se vuoi fermarti, imposta "stop": true
         self._log_prompt(prompt)
         self.stdout.write(self.style.NOTICE('Chiedo a LLM di decidere...'))
 
-        decision = self.llm.generate_json(prompt, timeout=180)
+        decision = self.llm.generate_json_streamed(prompt, timeout=180)
 
         if not isinstance(decision, dict):
             raise LLMException("Decisione non è dict")
@@ -226,7 +126,7 @@ Se vuoi fermarti, imposta "stop": true
             state = self._execute_method(action, args)
             self.stdout.write(
                 self.style.SUCCESS(
-                    f'Output metodo: {json.dumps(state, ensure_ascii=False, default=str)}'
+                    f'Output metodo: {json_utils.dumps(state, default=str)}'
                 )
             )
             self._update_memory_with_result(memory_record, state)
@@ -243,13 +143,13 @@ Se vuoi fermarti, imposta "stop": true
         method_spec = self.method_dict[action]
         converted_args = self._convert_parameter_types(args, method_spec)
 
-        self._log_converted_args(converted_args)
+        # Diagnostica solo con --verbosity 2 o superiore: la chiamata di debug a Matomo è una richiesta HTTP in più
+        if self.verbosity >= 2:
+            self._log_converted_args(converted_args)
+            if action == 'get_top_bounce_urls':
+                self._debug_matomo_call(converted_args)
 
-        # Debug Matomo se necessario
-        if action == 'get_top_bounce_urls':
-            self._debug_matomo_call(converted_args)
-
-        return getattr(self.agent, action)(**converted_args)
+        return self._method_callables[action](**converted_args)
 
     # ========== DEBUG ==========
 
@@ -271,73 +171,63 @@ Se vuoi fermarti, imposta "stop": true
 
     def _log_matomo_debug_info(self, raw_response: Any) -> None:
         """Logga informazioni di debug sulla risposta Matomo."""
-        self.stdout.write(
-            self.style.NOTICE(f'DEBUG - Risposta raw Matomo tipo: {type(raw_response).__name__}')
-        )
-        self.stdout.write(
-            self.style.NOTICE(
-                f'DEBUG - Risposta raw Matomo: '
-                f'{json.dumps(raw_response, ensure_ascii=False, indent=2, default=str)}'
-            )
-        )
+        lines = [
+            f'DEBUG - Risposta raw Matomo tipo: {type(raw_response).__name__}',
+            f'DEBUG - Risposta raw Matomo: {json_utils.dumps(raw_response, indent=True, default=str)}',
+        ]
 
         if isinstance(raw_response, dict):
-            self._log_dict_debug_info(raw_response)
+            lines.extend(self._dict_debug_lines(raw_response))
         elif isinstance(raw_response, list):
-            self._log_list_debug_info(raw_response)
+            lines.extend(self._list_debug_lines(raw_response))
+
+        self.stdout.write(self.style.NOTICE('\n'.join(lines)))
 
-    def _log_dict_debug_info(self, response: Dict) -> None:
-        """Logga informazioni di debug per una risposta dizionario."""
-        self.stdout.write(self.style.NOTICE(f'DEBUG - Keys del dict: {list(response.keys())}'))
+    def _dict_debug_lines(self, response: Dict) -> List[str]:
+        """Righe di debug per una risposta dizionario."""
+        lines = [f'DEBUG - Keys del dict: {list(response.keys())}']
         if 'result' in response:
-            self.stdout.write(self.style.NOTICE(f'DEBUG - Campo "result": {response["result"]}'))
+            lines.append(f'DEBUG - Campo "result": {response["result"]}')
         values = list(response.values())
-        self.stdout.write(self.style.NOTICE(f'DEBUG - Values del dict (primi 3): {values[:3]}'))
-        self.stdout.write(
-            self.style.NOTICE(f'DEBUG - Tipi values: {[type(v).__name__ for v in values[:3]]}')
-        )
+        lines.append(f'DEBUG - Values del dict (primi 3): {values[:3]}')
+        lines.append(f'DEBUG - Tipi values: {[type(v).__name__ for v in values[:3]]}')
+        return lines
 
-    def _log_list_debug_info(self, response: List) -> None:
-        """Logga informazioni di debug per una risposta lista."""
-        self.stdout.write(self.style.NOTICE(f'DEBUG - Lista con {len(response)} elementi'))
+    def _list_debug_lines(self, response: List) -> List[str]:
+        """Righe di debug per una risposta lista."""
+        lines = [f'DEBUG - Lista con {len(response)} elementi']
         if response:
-            self.stdout.write(
-                self.style.NOTICE(f'DEBUG - Primo elemento tipo: {type(response[0]).__name__}')
-            )
-            self.stdout.write(self.style.NOTICE(f'DEBUG - Primo elemento: {response[0]}'))
+            lines.append(f'DEBUG - Primo elemento tipo: {type(response[0]).__name__}')
+            lines.append(f'DEBUG - Primo elemento: {response[0]}')
+        return lines
 
     def _log_matomo_debug_error(self, error: Exception) -> None:
         """Logga errori di debug Matomo."""
-        import traceback
-        self.stdout.write(self.style.ERROR(f'DEBUG - Errore chiamata Matomo: {error}'))
-        self.stdout.write(self.style.ERROR(traceback.format_exc()))
+        self.stdout.write(self.style.ERROR(f'DEBUG - Errore chiamata Matomo: {error}\n{traceback.format_exc()}'))
 
     # ========== LOGGING ==========
 
     def _log_prompt(self, prompt: str) -> None:
         """Logga il prompt inviato all'LLM."""
-        self.stdout.write(self.style.MIGRATE_HEADING('\n' + '=' * 80))
-        self.stdout.write(self.style.MIGRATE_HEADING('PROMPT INVIATO AL LLM:'))
-        self.stdout.write(self.style.MIGRATE_HEADING('=' * 80))
-        self.stdout.write(prompt)
-        self.stdout.write(self.style.MIGRATE_HEADING('=' * 80 + '\n'))
+        bar = '=' * 80
+        header = self.style.MIGRATE_HEADING(f'\n{bar}\nPROMPT INVIATO AL LLM:\n{bar}')
+        footer = self.style.MIGRATE_HEADING(f'{bar}\n')
+        self.stdout.write(f'{header}\n{prompt}\n{footer}')
 
     def _log_decision(self, action: str, args: Dict[str, Any], reason: str) -> None:
         """Logga la decisione presa dall'LLM."""
-        self.stdout.write(self.style.WARNING(f'\nMetodo scelto: {action}'))
-        self.stdout.write(
-            self.style.WARNING(f'Parametri: {json.dumps(args, ensure_ascii=False)}')
-        )
-        self.stdout.write(self.style.WARNING(f'Motivazione: {reason}'))
+        self.stdout.write(self.style.WARNING(
+            f'\nMetodo scelto: {action}\n'
+            f'Parametri: {json_utils.dumps(args)}\n'
+            f'Motivazione: {reason}'
+        ))
 
     def _log_converted_args(self, converted_args: Dict[str, Any]) -> None:
         """Logga gli argomenti convertiti."""
-        self.stdout.write(self.style.NOTICE(f'DEBUG - Args convertiti: {converted_args}'))
-        self.stdout.write(
-            self.style.NOTICE(
-                f'DEBUG - Tipi: {[(k, type(v).__name__) for k, v in converted_args.items()]}'
-            )
-        )
+        self.stdout.write(self.style.NOTICE(
+            f'DEBUG - Args convertiti: {converted_args}\n'
+            f'DEBUG - Tipi: {[(k, type(v).__name__) for k, v in converted_args.items()]}'
+        ))
 
     def _log_parameter_warning(self, param_name: str, message: str) -> None:
         """Logga un warning sui parametri."""
@@ -361,22 +251,22 @@ Se vuoi fermarti, imposta "stop": true
         )
 
     def _log_execution_error(self, action: str, error: Exception) -> None:
-        """Logga un errore di esecuzione."""
-        import traceback
-        self.stdout.write(self.style.ERROR(f'Errore eseguendo {action}: {error}'))
-        self.stdout.write(self.style.ERROR(traceback.format_exc()))
+        """Logga un errore di esecuzione (con traceback completo solo con --verbosity 2 o superiore)."""
+        details = f'\n{traceback.format_exc()}' if self.verbosity >= 2 else ''
+        self.stdout.write(self.style.ERROR(f'Errore eseguendo {action}: {error.__class__.__name__}: {error}{details}'))
 
     # ========== MAIN LOOP ==========
 
-    def _process_decision_loop(self, methods: List[Dict], state: Any) -> None:
+    def _process_decision_loop(self, state: Any) -> None:
         """Processa il loop principale di decisione."""
         while True:
-            # Recupera e formatta la memoria
-            previous_memories = self._get_previous_memories()
-            memory_section = self._format_memory_section(previous_memories)
+            # Aggiorna la memoria con le sole azioni nuove (comprese quelle dei sotto-agenti)
+            # e formatta la sezione
+            self._refresh_memory()
+            memory_section = self._format_memory_section()
 
             # Costruisci il prompt
-            prompt = self._build_prompt(methods, state, memory_section)
+            prompt = self._build_prompt(state, memory_section)
 
             try:
                 # Ottieni decisione dall'LLM
@@ -400,28 +290,30 @@ Se vuoi fermarti, imposta "stop": true
                 # Esegui l'azione
                 state = self._execute_action(action, args, memory_record)
 
-                time.sleep(1)
-
             except LLMException as e:
                 self._handle_llm_error(prompt, e)
                 break
 
     def handle(self, *args, **options):
         """Entry point del comando."""
+        self.verbosity = options.get('verbosity', 1)
         self.stdout.write(self.style.MIGRATE_HEADING('Avvio agente LLM'))
 
         # Inizializza componenti
-        self.agent = AgentPlugins()
+        self.agent = AgentPlugins(verbosity=self.verbosity)
         self.llm = LLM()
 
         # Ottieni metodi disponibili
         methods = self.agent.get_available_methods()
         self.method_dict = {m['name']: m for m in methods}
+        # Metodi già risolti una volta sola, invece di un getattr a ogni azione
+        self._method_callables = {name: getattr(self.agent, name) for name in self.method_dict}
+        self._prepare_prompt(methods)
 
         # Stato iniziale
         state = None
 
         # Esegui il loop principale
-        self._process_decision_loop(methods, state)
+        self._process_decision_loop(state)
 
         self.stdout.write(self.style.MIGRATE_HEADING('\nAgente fermo'))
\ No newline at end of file
@@ -36,27 +36,23 @@ class Command(BaseSubAgent):
             help='Pulisce la memoria del PostAgent prima di iniziare'
         )
 
-    def _build_prompt(self, methods, state, memory_section, context):
-        """Costruisce un prompt specifico per il PostAgent."""
+    def _build_prompt_prefix(self, context):
+        """Parte fissa iniziale del prompt del PostAgent."""
         slug = context.get('slug', 'unknown')
         task = context.get('task', 'general')
 
-        prompt_base = f"""Sei PostAgent, un assistente specializzato e AUTONOMO nella gestione e ottimizzazione dei blog post.
+        return f"""Sei PostAgent, un assistente specializzato e AUTONOMO nella gestione e ottimizzazione dei blog post.
 
 Ti è stato delegato il lavoro sul blog post con slug: "{slug}"
 Contesto generale del task: {task}
 
 Hai questi metodi disponibili:
-{{methods}}
-
-Stato corrente:
-{{state}}"""
-
-        if memory_section:
-            prompt_base += "\n{memory}"
-
-        prompt_base += """
+{self._methods_json}
+"""
 
+    def _build_prompt_suffix(self):
+        """Istruzioni finali del prompt del PostAgent."""
+        return """
 SEI AUTONOMO: Devi decidere tu quali azioni eseguire.
 
 Il tuo workflow tipico:
@@ -68,22 +64,16 @@ Il tuo workflow tipico:
 Decidi la sequenza di azioni più appropriata in base allo stato corrente.
 
 Rispondi SOLO con JSON in questo formato:
-{{
+{
   "action": "nome_metodo",
-  "args": {{parametri}},
+  "args": {parametri},
   "reason": "perché hai scelto questo",
   "stop": false
-}}
+}
 
 Quando hai completato TUTTE le analisi e azioni necessarie, imposta "stop": true per tornare al main agent.
 """
 
-        return prompt_base.format(
-            methods=methods,
-            state=state,
-            memory=memory_section
-        )
-
     def handle(self, *args, **options):
         """Entry point del comando - per compatibilità CLI."""
         # Se chiamato da CLI senza contesto, errore
@@ -91,16 +81,18 @@ Quando hai completato TUTTE le analisi e azioni necessarie, imposta "stop": true
             self.style.ERROR('PostAgent deve essere chiamato tramite delegate_to_post_agent del main agent')
         )
 
-    def execute(self, slug: str, task: str = 'analyze_and_improve') -> Dict[str, Any]:
+    def execute(self, slug: str, task: str = 'analyze_and_improve', verbosity: int = 1) -> Dict[str, Any]:
         """Esegue il PostAgent programmaticamente con slug e task.
 
         Args:
             slug: Slug del post da processare
             task: Task da eseguire
+            verbosity: Livello di dettaglio dell'output, come --verbosity
 
         Returns:
             Risultato dell'esecuzione
         """
+        self.verbosity = verbosity
         context = {
             'slug': slug,
             'task': task,
@@ -116,21 +108,15 @@ Quando hai completato TUTTE le analisi e azioni necessarie, imposta "stop": true
             self.style.MIGRATE_HEADING(f'{"=" * 80}\n')
         )
 
-        # Esegui l'agente
-        self.run_agent(context)
-
-        # Recupera l'ultima memoria per il risultato
-        from friday_night_assistant.models.mysql_models.models import AgentMemory
-        last_memory = AgentMemory.objects.filter(
-            agent_type=self.AGENT_TYPE
-        ).order_by('-created_at').first()
+        # Esegui l'agente: restituisce l'ultima azione eseguita, già completa di risultato
+        last_memory = self.run_agent(context)
 
-        if last_memory and last_memory.value:
+        if last_memory:
             return {
                 'success': True,
                 'agent': self.AGENT_NAME,
                 'slug': slug,
-                'last_action': last_memory.value
+                'last_action': last_memory
             }
 
         return {
@@ -36,27 +36,23 @@ class Command(BaseSubAgent):
             help='Pulisce la memoria del TutorialAgent prima di iniziare'
         )
 
-    def _build_prompt(self, methods, state, memory_section, context):
-        """Costruisce un prompt specifico per il TutorialAgent."""
+    def _build_prompt_prefix(self, context):
+        """Parte fissa iniziale del prompt del TutorialAgent."""
         slug = context.get('slug', 'unknown')
         task = context.get('task', 'general')
 
-        prompt_base = f"""Sei TutorialAgent, un assistente specializzato e AUTONOMO nella gestione e ottimizzazione dei tutorial tecnici.
+        return f"""Sei TutorialAgent, un assistente specializzato e AUTONOMO nella gestione e ottimizzazione dei tutorial tecnici.
 
 Ti è stato delegato il lavoro sul tutorial con slug: "{slug}"
 Contesto generale del task: {task}
 
 Hai questi metodi disponibili:
-{{methods}}
-
-Stato corrente:
-{{state}}"""
-
-        if memory_section:
-            prompt_base += "\n{memory}"
-
-        prompt_base += """
+{self._methods_json}
+"""
 
+    def _build_prompt_suffix(self):
+        """Istruzioni finali del prompt del TutorialAgent."""
+        return """
 SEI AUTONOMO: Devi decidere tu quali azioni eseguire.
 
 Il tuo workflow tipico:
@@ -69,22 +65,16 @@ Il tuo workflow tipico:
 Decidi la sequenza di azioni più appropriata in base allo stato corrente.
 
 Rispondi SOLO con JSON in questo formato:
-{{
+{
   "action": "nome_metodo",
-  "args": {{parametri}},
+  "args": {parametri},
   "reason": "perché hai scelto questo",
   "stop": false
-}}
+}
 
 Quando hai completato TUTTE le analisi e azioni necessarie, imposta "stop": true per tornare al main agent.
 """
 
-        return prompt_base.format(
-            methods=methods,
-            state=state,
-            memory=memory_section
-        )
-
     def handle(self, *args, **options):
         """Entry point del comando - per compatibilità CLI."""
         # Se chiamato da CLI senza contesto, errore
@@ -92,16 +82,18 @@ Quando hai completato TUTTE le analisi e azioni necessarie, imposta "stop": true
             self.style.ERROR('TutorialAgent deve essere chiamato tramite delegate_to_tutorial_agent del main agent')
         )
 
-    def execute(self, slug: str, task: str = 'analyze_and_improve') -> Dict[str, Any]:
+    def execute(self, slug: str, task: str = 'analyze_and_improve', verbosity: int = 1) -> Dict[str, Any]:
         """Esegue il TutorialAgent programmaticamente con slug e task.
 
         Args:
             slug: Slug del tutorial da processare
             task: Task da eseguire
+            verbosity: Livello di dettaglio dell'output, come --verbosity
 
         Returns:
             Risultato dell'esecuzione
         """
+        self.verbosity = verbosity
         context = {
             'slug': slug,
             'task': task,
@@ -117,21 +109,15 @@ Quando hai completato TUTTE le analisi e azioni necessarie, imposta "stop": true
             self.style.MIGRATE_HEADING(f'{"=" * 80}\n')
         )
 
-        # Esegui l'agente
-        self.run_agent(context)
-
-        # Recupera l'ultima memoria per il risultato
-        from friday_night_assistant.models.mysql_models.models import AgentMemory
-        last_memory = AgentMemory.objects.filter(
-            agent_type=self.AGENT_TYPE
-        ).order_by('-created_at').first()
+        # Esegui l'agente: restituisce l'ultima azione eseguita, già completa di risultato
+        last_memory = self.run_agent(context)
 
-        if last_memory and last_memory.value:
+        if last_memory:
             return {
                 'success': True,
                 'agent': self.AGENT_NAME,
                 'slug': slug,
-                'last_action': last_memory.value
+                'last_action': last_memory
             }
 
         return {
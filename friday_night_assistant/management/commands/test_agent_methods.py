@@ -1,11 +1,11 @@
 from django.core.management.base import BaseCommand
-from typing import Any, Dict, Optional
-import json
+from django.utils.module_loading import import_string
+from typing import Any, Callable, Dict, Optional
 import logging
+import traceback
 
-from friday_night_assistant.plugins import AgentPlugins
-from friday_night_assistant.plugins.tutorial_plugins import TutorialAgentPlugins
-from friday_night_assistant.plugins.post_plugins import PostAgentPlugins
+from friday_night_assistant import json_utils
+from friday_night_assistant.agent_common import PARAM_TYPES, TYPE_CONVERTERS
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +13,10 @@ logger = logging.getLogger(__name__)
 class Command(BaseCommand):
     help = "Test helper per eseguire i metodi esposti dai plugin (AgentPlugins, TutorialAgentPlugins, PostAgentPlugins)"
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.verbosity = 1
+
     def add_arguments(self, parser):
         parser.add_argument('--plugin', type=str, choices=['agent', 'tutorial', 'post'], default='agent', help='Plugin da utilizzare: agent, tutorial o post')
         parser.add_argument('--list', action='store_true', help='Elenca i metodi disponibili e la loro specifica')
@@ -26,8 +30,8 @@ class Command(BaseCommand):
         if not args_str:
             return {}
         try:
-            return json.loads(args_str)
-        except json.JSONDecodeError as e:
+            return json_utils.loads(args_str)
+        except json_utils.JSONDecodeError as e:
             self.stdout.write(self.style.ERROR(f'Errore parsing JSON: {e}'))
             return {}
 
@@ -47,30 +51,14 @@ class Command(BaseCommand):
 
     def _convert_parameter(self, value: Any, param_type: str) -> Any:
         """Convert a single parameter to its expected type."""
-        if value is None:
-            return None
-
-        converters = {
-            'int': lambda v: int(v),
-            'float': lambda v: float(v),
-            'bool': lambda v: v.lower() in ('true', '1', 'yes') if isinstance(v, str) else bool(v),
-            'list': self._convert_to_list,
-            'dict': lambda v: json.loads(v) if isinstance(v, str) else v,
-        }
-
-        converter = converters.get(param_type, str)
-        return converter(value)
-
-    def _convert_to_list(self, value: Any) -> list:
-        """Convert value to list with multiple strategies."""
-        if isinstance(value, list):
+        # Valori già del tipo dichiarato (es. i default di --auto-run): nessuna conversione
+        if value is None or type(value) is PARAM_TYPES.get(param_type):
             return value
-        if isinstance(value, str):
-            try:
-                return json.loads(value)
-            except json.JSONDecodeError:
-                return [item.strip() for item in value.split(',')]
-        return [value]
+
+        if param_type == 'dict':
+            return json_utils.loads(value) if isinstance(value, str) else value
+        # Stessa tabella di conversione degli agenti
+        return TYPE_CONVERTERS.get(param_type, str)(value)
 
     def _convert_parameters(self, args: Dict[str, Any], method_spec: Dict[str, Any]) -> Dict[str, Any]:
         """Convert all parameters to their expected types."""
@@ -85,7 +73,7 @@ class Command(BaseCommand):
             param_type = params_spec[name].get('type', 'str')
             try:
                 converted[name] = self._convert_parameter(value, param_type)
-            except (ValueError, TypeError, json.JSONDecodeError):
+            except (ValueError, TypeError, json_utils.JSONDecodeError):
                 converted[name] = value
 
         return converted
@@ -101,37 +89,58 @@ class Command(BaseCommand):
                 for k, v in params.items():
                     self.stdout.write(f"    - {k}: {v}")
 
-    def _execute_method(self, agent: Any, method_name: str, args: Dict[str, Any],
+    def _format_result(self, result: Any) -> str:
+        """Format a method result according to the requested verbosity."""
+        if self.verbosity == 0:
+            # Solo un riepilogo: niente serializzazione del risultato
+            size = f' ({len(result)} elementi)' if isinstance(result, (list, dict)) else ''
+            return f'{type(result).__name__}{size}'
+        return json_utils.dumps(result, indent=self.verbosity >= 2, default=str)
+
+    def _execute_method(self, method: Optional[Callable[..., Any]], method_name: str, args: Dict[str, Any],
                         spec: Dict[str, Any], dry_run: bool = False) -> bool:
         """Execute a single method with error handling. Returns success status."""
-        self.stdout.write(self.style.WARNING(
-            f'Chiamata {method_name} con args: {json.dumps(args, ensure_ascii=False)}'
-        ))
+        # Tutto l'output della chiamata viene scritto con una sola write alla fine
+        lines = []
+        try:
+            return self._run_method(method, method_name, args, spec, dry_run, lines)
+        finally:
+            self.stdout.write('\n'.join(lines))
+
+    def _run_method(self, method: Optional[Callable[..., Any]], method_name: str, args: Dict[str, Any],
+                    spec: Dict[str, Any], dry_run: bool, lines: list) -> bool:
+        """Body of _execute_method: appends the output lines to `lines`."""
+        if self.verbosity == 0:
+            lines.append(self.style.WARNING(f'Chiamata {method_name}'))
+        else:
+            lines.append(self.style.WARNING(
+                f'Chiamata {method_name} con args: {json_utils.dumps(args)}'
+            ))
 
         if dry_run:
             return True
 
-        if not hasattr(agent, method_name):
-            self.stdout.write(self.style.ERROR(f"Metodo {method_name} non implementato"))
+        if method is None:
+            lines.append(self.style.ERROR(f"Metodo {method_name} non implementato"))
             return False
 
         try:
             converted = self._convert_parameters(args, spec)
-            self.stdout.write(self.style.NOTICE(
-                f'Args convertiti: {[(k, type(v).__name__) for k, v in converted.items()]}'
-            ))
-            result = getattr(agent, method_name)(**converted)
-            self.stdout.write(self.style.SUCCESS(
-                f'Result {method_name}: {json.dumps(result, ensure_ascii=False, default=str, indent=2)}'
+            if self.verbosity >= 2:
+                lines.append(self.style.NOTICE(
+                    f'Args convertiti: {[(k, type(v).__name__) for k, v in converted.items()]}'
+                ))
+            result = method(**converted)
+            lines.append(self.style.SUCCESS(
+                f'Result {method_name}: {self._format_result(result)}'
             ))
             return True
         except Exception as e:
-            import traceback
-            self.stdout.write(self.style.ERROR(f'Errore eseguendo {method_name}: {e}'))
-            self.stdout.write(self.style.ERROR(traceback.format_exc()))
+            lines.append(self.style.ERROR(f'Errore eseguendo {method_name}: {e}'))
+            lines.append(self.style.ERROR(traceback.format_exc()))
             return False
 
-    def _auto_run_methods(self, agent: Any, methods: list, dry_run: bool):
+    def _auto_run_methods(self, bound: Dict[str, Optional[Callable[..., Any]]], methods: list, dry_run: bool):
         """Execute all available methods with default parameters."""
         self.stdout.write(self.style.NOTICE('Esecuzione automatica dei metodi disponibili'))
 
@@ -142,9 +151,9 @@ class Command(BaseCommand):
                 pname: self._get_default_value(pname, pspec)
                 for pname, pspec in params.items()
             }
-            self._execute_method(agent, name, call_args, m, dry_run)
+            self._execute_method(bound[name], name, call_args, m, dry_run)
 
-    def _run_single_method(self, agent: Any, method_name: str,
+    def _run_single_method(self, method: Optional[Callable[..., Any]], method_name: str,
                            method_spec: Dict[str, Any], args_json: Optional[str], dry_run: bool):
         """Execute a single specified method."""
         raw_args = self._parse_args_json(args_json)
@@ -157,32 +166,37 @@ class Command(BaseCommand):
                 if 'default' in pspec
             }
 
-        self._execute_method(agent, method_name, raw_args, method_spec, dry_run)
+        self._execute_method(method, method_name, raw_args, method_spec, dry_run)
 
     def handle(self, *args, **options):
+        # 0: solo riepiloghi, 1: risultati JSON compatti, 2+: JSON indentato e args convertiti
+        self.verbosity = options.get('verbosity', 1)
         plugin_choice = options.get('plugin', 'agent')
 
+        # Import solo del plugin scelto (html2text, client Matomo, ...)
         plugin_map = {
-            'agent': AgentPlugins,
-            'tutorial': TutorialAgentPlugins,
-            'post': PostAgentPlugins,
+            'agent': 'friday_night_assistant.plugins.agent_plugins.AgentPlugins',
+            'tutorial': 'friday_night_assistant.plugins.tutorial_plugins.TutorialAgentPlugins',
+            'post': 'friday_night_assistant.plugins.post_plugins.PostAgentPlugins',
         }
 
         if plugin_choice not in plugin_map:
             self.stdout.write(self.style.ERROR('Plugin non valido scelto'))
             return
 
-        plugin_class = plugin_map[plugin_choice]
+        plugin_class = import_string(plugin_map[plugin_choice])
         methods = plugin_class.get_available_methods()
         method_dict = {m['name']: m for m in methods}
         agent = plugin_class()
+        # Metodi risolti una volta sola (None se dichiarati ma non implementati)
+        bound = {name: getattr(agent, name, None) for name in method_dict}
 
         if options['list']:
             self._list_methods(methods, plugin_choice)
             return
 
         if options['auto_run']:
-            self._auto_run_methods(agent, methods, options['dry_run'])
+            self._auto_run_methods(bound, methods, options['dry_run'])
             return
 
         method_name = options.get('method')
@@ -194,7 +208,7 @@ class Command(BaseCommand):
                 return
 
             self._run_single_method(
-                agent, method_name, method_dict[method_name],
+                bound[method_name], method_name, method_dict[method_name],
                 options.get('args_json'), options['dry_run']
             )
             return
@@ -1,7 +1,7 @@
 from django.core.management.base import BaseCommand
+from friday_night_assistant import json_utils
 from friday_night_assistant.matomo.client import MatomoClient
 from friday_night_assistant.plugins import AgentPlugins
-import json
 
 
 class Command(BaseCommand):
@@ -25,24 +25,24 @@ class Command(BaseCommand):
         try:
             if method == 'visits':
                 out = client.get_visits(site_id, period, date)
-                self.stdout.write(json.dumps(out, indent=2, ensure_ascii=False))
+                self.stdout.write(json_utils.dumps(out, indent=True, default=str))
                 return
 
             if method == 'pageviews':
                 out = client.get_pageviews(site_id, period, date)
-                self.stdout.write(json.dumps(out, indent=2, ensure_ascii=False))
+                self.stdout.write(json_utils.dumps(out, indent=True, default=str))
                 return
 
             if method == 'top-pages':
                 out = client.get_top_pages(site_id, period, date, limit)
-                self.stdout.write(json.dumps(out, indent=2, ensure_ascii=False))
+                self.stdout.write(json_utils.dumps(out, indent=True, default=str))
                 return
 
             if method == 'bounce-urls':
                 agent = AgentPlugins(client)
                 out = agent.get_top_bounce_urls(site_id=site_id, period=period, date=date, limit=limit)
-                self.stdout.write(json.dumps(out, indent=2, ensure_ascii=False))
+                self.stdout.write(json_utils.dumps(out, indent=True, default=str))
                 return
 
         except Exception as e:
-            self.stdout.write(json.dumps({"error": str(e)}, indent=2, ensure_ascii=False))
+            self.stdout.write(json_utils.dumps({"error": str(e)}, indent=True))
@@ -1,9 +1,56 @@
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+
 import requests
-from typing import Optional, Dict, Any, Callable
+from requests.adapters import HTTPAdapter
+from typing import Optional, Dict, Any, Callable, Iterable
+from urllib3.util.retry import Retry
+
+from friday_night_assistant import json_utils
+
+
+# Response normalizers: defined once at module level instead of per-call closures.
+def _norm_visits(d):
+    return {"visits": d.get("nb_visits")}
+
+
+def _norm_pageviews(d):
+    return {"pageviews": d.get("nb_pageviews")}
+
+
+def _norm_top_pages(d, limit: int):
+    items = d if isinstance(d, list) else list(d.values())
+    out = []
+    for item in items[:limit]:
+        url = item.get("url") or item.get("label") or "N/A"
+        pv = item.get("nb_hits") or item.get("nb_visits")
+        out.append({"url": url, "pageviews": pv})
+    return out
+
+
+def _norm_bounce(d, limit: int):
+    items = d if isinstance(d, list) else list(d.values())
+    out = []
+    for item in items[:limit]:
+        url = item.get("url") or item.get("label") or item.get("pageUrl") or "N/A"
+        b = item.get("bounce_rate")
+        # Actions reports send the rate as a "NN%" string, already on the 0-100 scale
+        if isinstance(b, str) and b.endswith("%"):
+            b = b[:-1]
+        try:
+            b = float(b)
+        except Exception:
+            pass
+        out.append({"url": url, "bounce_rate": b})
+    return out
 
 
 class MatomoClient:
+    POOL_CONNECTIONS = 8
+    POOL_MAXSIZE = 16
+    FIXED_PARAMS = {"module": "API", "format": "JSON"}
+
     def __init__(self, base_url: Optional[str] = None, token: Optional[str] = None, timeout: int = 10):
         self.base_url = base_url or os.environ.get("MATOMO_URL")
         self.token = token or os.environ.get("MATOMO_AUTH_TOKEN")
@@ -15,55 +62,63 @@ class MatomoClient:
         if not self.base_url.endswith("/"):
             self.base_url += "/"
 
+        self.url = self.base_url + "index.php"
+        self._post_data = {"token_auth": self.token}
+        self._token_bytes = self.token.encode()
+
+        # Keep-alive session: reuse TCP/TLS connections to Matomo across calls.
+        # The reporting API is read-only, so retrying POSTs on connection errors is safe.
+        adapter = HTTPAdapter(
+            pool_connections=self.POOL_CONNECTIONS,
+            pool_maxsize=self.POOL_MAXSIZE,
+            max_retries=Retry(total=2, backoff_factor=0.1, allowed_methods=None)
+        )
+        self._session = requests.Session()
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    def close(self) -> None:
+        """Close the underlying HTTP session and release pooled connections."""
+        self._session.close()
+
     def _api_request(self, params: Dict[str, Any], normalize: Optional[Callable] = None) -> Any:
-        url = self.base_url + "index.php"
-        fixed = {"module": "API", "format": "JSON"}
-        full = {**params, **fixed}
-        resp = requests.post(url, params=full, data={"token_auth": self.token}, timeout=self.timeout)
+        full = {**params, **self.FIXED_PARAMS}
+        resp = self._session.post(self.url, params=full, data=self._post_data, timeout=self.timeout)
         resp.raise_for_status()
         try:
-            data = resp.json()
-        except Exception:
-            raise RuntimeError("Matomo returned non-json: %s" % resp.text)
-
-        if normalize:
-            try:
-                return normalize(data)
-            except Exception:
-                raise RuntimeError("Normalization failed")
+            # Parse the raw bytes: skips the charset detection and decode done by resp.json()
+            data = json_utils.loads(resp.content)
+        except ValueError:
+            # Error pages may echo the request: redact the token on the bytes, before decoding
+            body = resp.content.replace(self._token_bytes, b"***").decode("utf-8", errors="replace")
+            raise RuntimeError("Matomo returned non-json: %s" % body)
 
-        return data
+        if normalize is None:
+            return data
+        try:
+            return normalize(data)
+        except Exception as e:
+            raise RuntimeError("Normalization failed") from e
 
     def get_visits(self, site_id: int, period: str = "day", date: str = "today"):
         return self._api_request({
             "method": "VisitsSummary.get",
             "idSite": site_id,
             "period": period,
-            "date": date
-        }, normalize=lambda d: {
-            "visits": d.get("nb_visits")
-        })
+            "date": date,
+            "showColumns": "nb_visits"
+        }, normalize=_norm_visits)
 
     def get_pageviews(self, site_id: int, period: str = "day", date: str = "today"):
         return self._api_request({
             "method": "Actions.get",
             "idSite": site_id,
             "period": period,
-            "date": date
-        }, normalize=lambda d: {
-            "pageviews": d.get("nb_pageviews")
-        })
+            "date": date,
+            "showColumns": "nb_pageviews"
+        }, normalize=_norm_pageviews)
 
     def get_top_pages(self, site_id: int, period: str = "day", date: str = "today", limit: int = 10):
-        def norm(d):
-            items = d if isinstance(d, list) else list(d.values())
-            out = []
-            for item in items[:limit]:
-                url = item.get("url") or item.get("label") or "N/A"
-                pv = item.get("nb_hits") or item.get("nb_visits")
-                out.append({"url": url, "pageviews": pv})
-            return out
-
         return self._api_request({
             "method": "Actions.getPageUrls",
             "idSite": site_id,
@@ -71,23 +126,12 @@ class MatomoClient:
             "date": date,
             # use flat=1 to return a flattened list of page URLs instead of hierarchical tree
             "flat": 1,
-            "filter_limit": limit
-        }, normalize=norm)
+            "filter_limit": limit,
+            # only the columns read by the normalizer: smaller payload to transfer and parse
+            "showColumns": "label,url,nb_hits,nb_visits"
+        }, normalize=partial(_norm_top_pages, limit=limit))
 
     def get_worst_bounce_urls(self, site_id: int, period: str = "day", date: str = "today", limit: int = 50):
-        def norm(d):
-            items = d if isinstance(d, list) else list(d.values())
-            out = []
-            for item in items[:limit]:
-                url = item.get("url") or item.get("label") or item.get("pageUrl") or "N/A"
-                b = item.get("bounce_rate")
-                try:
-                    b = float(b)
-                except Exception:
-                    pass
-                out.append({"url": url, "bounce_rate": b})
-            return out
-
         return self._api_request({
             "method": "Actions.getPageUrls",
             "idSite": site_id,
@@ -97,5 +141,41 @@ class MatomoClient:
             "flat": 1,
             "filter_sort_column": "bounce_rate",
             "filter_sort_order": "desc",
-            "filter_limit": limit
-        }, normalize=norm)
+            "filter_limit": limit,
+            "showColumns": "label,url,bounce_rate"
+        }, normalize=partial(_norm_bounce, limit=limit))
+
+
+def get_all_sites_data(
+        client: MatomoClient,
+        site_ids: Iterable[int] = (1, 2, 3),
+        period: str = "day",
+        date: str = "today",
+        max_workers: int = 8
+) -> Dict[int, Any]:
+    """Fetch the visits summary of several sites concurrently.
+
+    Requests run on a small thread pool and share the client's connection pool.
+    A failing site does not abort the others: its entry holds {"error": ...}.
+    The token only travels in the POST body and error bodies are redacted by
+    the client, so exception messages can be used as they are.
+    """
+    site_ids = list(site_ids)
+    if not site_ids:
+        return {}
+
+    results: Dict[int, Any] = {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(site_ids))) as executor:
+        futures = {
+            executor.submit(client.get_visits, site_id=site_id, period=period, date=date): site_id
+            for site_id in site_ids
+        }
+        for future in as_completed(futures):
+            site_id = futures[future]
+            try:
+                results[site_id] = future.result()
+            except Exception as e:
+                results[site_id] = {"error": str(e)}
+
+    # Keep the caller's site order
+    return {site_id: results[site_id] for site_id in site_ids}
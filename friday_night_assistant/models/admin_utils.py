@@ -0,0 +1,7 @@
+"""Helpers shared by the admin modules of both databases."""
+
+
+def is_changelist(request):
+    """Return True when the admin request is rendering a changelist page."""
+    match = request.resolver_match
+    return bool(match and match.url_name and match.url_name.endswith('_changelist'))
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import AgentMemory, AgentTask
+from friday_night_assistant.models.admin_utils import is_changelist
 
 
 @admin.register(AgentMemory)
@@ -7,6 +8,13 @@ class AgentMemoryAdmin(admin.ModelAdmin):
     list_display = ('id', 'key', 'updated_at')
     search_fields = ('id', 'key')
 
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        # The list only shows these columns: don't load the value JSON for every row
+        if is_changelist(request):
+            qs = qs.only('id', 'key', 'updated_at')
+        return qs
+
 
 @admin.register(AgentTask)
 class AgentTaskAdmin(admin.ModelAdmin):
@@ -0,0 +1,21 @@
+# Generated by Django 6.0 on 2026-10-15 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mysql_models', '0002_agentmemory_agent_type_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='agenttask',
+            index=models.Index(fields=['status', 'scheduled_for'], name='mysql_model_status_94483d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='agenttask',
+            index=models.Index(fields=['status', '-id'], name='mysql_model_status_a4c596_idx'),
+        ),
+    ]
@@ -45,6 +45,10 @@ class AgentTask(models.Model):
         verbose_name = 'Agent Task'
         verbose_name_plural = 'Agent Tasks'
         managed = True
+        indexes = [
+            models.Index(fields=['status', 'scheduled_for']),
+            models.Index(fields=['status', '-id']),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.status})"
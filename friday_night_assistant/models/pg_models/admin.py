@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import Post, Tutorial, Domain, Category
+from friday_night_assistant.models.admin_utils import is_changelist
 
 
 @admin.register(Post)
@@ -7,6 +8,13 @@ class PostAdmin(admin.ModelAdmin):
     list_display = ('id', 'title_display', 'status', 'counter')
     search_fields = ('title',)
 
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        # The list only shows these columns: don't load the body JSON for every row
+        if is_changelist(request):
+            qs = qs.only('id', 'title', 'status', 'counter')
+        return qs
+
     def title_display(self, obj):
         if isinstance(obj.title, dict):
             return obj.title.get('en') or next(iter(obj.title.values()), '')
@@ -20,6 +28,12 @@ class TutorialAdmin(admin.ModelAdmin):
     list_display = ('id', 'title_display', 'status')
     search_fields = ('title',)
 
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        if is_changelist(request):
+            qs = qs.only('id', 'title', 'status')
+        return qs
+
     def title_display(self, obj):
         if isinstance(obj.title, dict):
             return obj.title.get('en') or next(iter(obj.title.values()), '')
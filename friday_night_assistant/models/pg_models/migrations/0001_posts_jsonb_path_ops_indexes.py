@@ -0,0 +1,122 @@
+# The pg_models tables are not managed by Django: the CreateModel operations only record
+# their state (no DDL), so makemigrations finds nothing to add on top of this chain.
+# The indexes are created with raw SQL on the postgres alias
+# (python manage.py migrate pg_models --database=postgres).
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Post',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('title', models.JSONField()),
+                ('status', models.CharField(blank=True, max_length=50, null=True)),
+                ('body', models.JSONField(blank=True, null=True)),
+                ('counter', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Post',
+                'verbose_name_plural': 'Posts',
+                'db_table': 'posts',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='Tutorial',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('title', models.JSONField()),
+                ('status', models.CharField(blank=True, max_length=50, null=True)),
+                ('body', models.JSONField(blank=True, null=True)),
+                ('slug', models.JSONField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Tutorial',
+                'verbose_name_plural': 'Tutorials',
+                'db_table': 'tutorials',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='Domain',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('description', models.TextField(blank=True)),
+            ],
+            options={
+                'verbose_name': 'Domain',
+                'verbose_name_plural': 'Domains',
+                'db_table': 'domains',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='Category',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('slug', models.SlugField(max_length=255, unique=True)),
+            ],
+            options={
+                'verbose_name': 'Category',
+                'verbose_name_plural': 'Categories',
+                'db_table': 'categories',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='Categorizable',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.BigIntegerField()),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='pg_models.category')),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype')),
+            ],
+            options={
+                'verbose_name': 'Categorizable',
+                'verbose_name_plural': 'Categorizables',
+                'db_table': 'categorizables',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='Dominable',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.BigIntegerField()),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype')),
+                ('domain', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='pg_models.domain')),
+            ],
+            options={
+                'verbose_name': 'Dominable',
+                'verbose_name_plural': 'Dominables',
+                'db_table': 'dominables',
+                'managed': False,
+            },
+        ),
+        # GIN jsonb_path_ops: backs the `@>` containment lookups (body__contains / title__contains)
+        # used by AgentPlugins.get_post_by_slug, smaller than the default jsonb_ops
+        migrations.RunSQL(
+            sql="CREATE INDEX CONCURRENTLY IF NOT EXISTS posts_body_slug_idx ON posts USING gin (body jsonb_path_ops);",
+            reverse_sql="DROP INDEX CONCURRENTLY IF EXISTS posts_body_slug_idx;",
+        ),
+        migrations.RunSQL(
+            sql="CREATE INDEX CONCURRENTLY IF NOT EXISTS posts_title_slug_idx ON posts USING gin (title jsonb_path_ops);",
+            reverse_sql="DROP INDEX CONCURRENTLY IF EXISTS posts_title_slug_idx;",
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Trigram indexes for the icontains fallback of AgentPlugins.get_post_by_slug.
+# Django compiles `field__icontains` on Postgres to UPPER("field"::text) LIKE UPPER(%s):
+# the indexed expression must be the same for the planner to use it.
+#
+# CREATE EXTENSION needs a superuser (or, from PostgreSQL 13, CREATE privilege on the database,
+# pg_trgm being a trusted extension). Without it, have an administrator run
+# `CREATE EXTENSION IF NOT EXISTS pg_trgm;` first: the statement below is then a no-op.
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('pg_models', '0001_posts_jsonb_path_ops_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="CREATE EXTENSION IF NOT EXISTS pg_trgm;",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.RunSQL(
+            sql="CREATE INDEX CONCURRENTLY IF NOT EXISTS posts_title_trgm ON posts USING gin (UPPER(title::text) gin_trgm_ops);",
+            reverse_sql="DROP INDEX CONCURRENTLY IF EXISTS posts_title_trgm;",
+        ),
+        migrations.RunSQL(
+            sql="CREATE INDEX CONCURRENTLY IF NOT EXISTS posts_body_trgm ON posts USING gin (UPPER(body::text) gin_trgm_ops);",
+            reverse_sql="DROP INDEX CONCURRENTLY IF EXISTS posts_body_trgm;",
+        ),
+    ]
@@ -0,0 +1,21 @@
+# GIN index for TutorialAgentPlugins._find_tutorial_by_slug, which matches the slug in any
+# language key with `slug @? '$.* ? (@ == "<slug>")'`.
+# The default jsonb_ops opclass is required: jsonb_path_ops cannot serve the `.*` wildcard accessor.
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('pg_models', '0002_posts_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="CREATE INDEX CONCURRENTLY IF NOT EXISTS tutorials_slug_gin_idx ON tutorials USING gin (slug);",
+            reverse_sql="DROP INDEX CONCURRENTLY IF EXISTS tutorials_slug_gin_idx;",
+        ),
+    ]
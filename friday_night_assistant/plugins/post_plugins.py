@@ -1,10 +1,13 @@
 """Plugin interface for PostAgent - specialized in blog post operations."""
 
-from typing import Optional, List, Dict, Any
+from functools import lru_cache
+from typing import Optional, List, Dict, Any, Tuple
 import logging
 
-from friday_night_assistant.models.pg_models.models import Post, Category
-from django.core.exceptions import FieldError
+from django.contrib.contenttypes.models import ContentType
+
+from friday_night_assistant.models.pg_models.models import Categorizable, Category, Post
+from friday_night_assistant.plugins.slug_search import find_by_slug, invalidate_slug_lookup
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +19,7 @@ class PostAgentPlugins:
         pass
 
     @staticmethod
+    @lru_cache(maxsize=None)
     def get_available_methods() -> List[Dict[str, Any]]:
         """Return list of available methods for PostAgent."""
         return [
@@ -60,6 +64,18 @@ class PostAgentPlugins:
                 },
                 "returns": "List of category names"
             },
+            {
+                "name": "get_post_with_categories",
+                "description": "Get the details and the categories of a blog post at once (prefer it over get_post_details + get_post_categories)",
+                "parameters": {
+                    "slug": {
+                        "type": "str",
+                        "required": True,
+                        "description": "The blog post slug"
+                    }
+                },
+                "returns": "Dict with 'details' (as get_post_details) and 'categories' (list of names), or None if not found"
+            },
             {
                 "name": "analyze_post_quality",
                 "description": "Analyze the quality of a blog post content",
@@ -88,6 +104,33 @@ class PostAgentPlugins:
         if not post:
             return None
 
+        return PostAgentPlugins._post_details(post)
+
+    @staticmethod
+    def get_post_with_categories(slug: str) -> Optional[Dict[str, Any]]:
+        """Get the details and the categories of a blog post.
+
+        Two queries in total (slug search, categories join) instead of the
+        two slug searches of get_post_details + get_post_categories.
+
+        Args:
+            slug: The post slug to search for
+
+        Returns:
+            Dict with 'details' and 'categories', or None if not found
+        """
+        post = PostAgentPlugins._find_post_by_slug(slug)
+        if not post:
+            return None
+
+        return {
+            "details": PostAgentPlugins._post_details(post),
+            "categories": PostAgentPlugins._category_names(post.id, slug)
+        }
+
+    @staticmethod
+    def _post_details(post: Post) -> Dict[str, Any]:
+        """Serialize the fields exposed by get_post_details."""
         return {
             "id": post.id,
             "title": post.title,
@@ -107,21 +150,24 @@ class PostAgentPlugins:
         Returns:
             Dict with success status
         """
-        post = PostAgentPlugins._find_post_by_slug(slug)
+        # Only the pk is needed: the body is written with a single UPDATE of that column
+        post = PostAgentPlugins._find_post_by_slug(slug, fields=('id',))
         if not post:
             return {"error": f"Post with slug '{slug}' not found"}
 
         try:
-            post.body = new_content
-            post.save()
-            logger.info(f"Post {slug} content updated successfully")
+            if not Post.objects.filter(pk=post.pk).update(body=new_content):
+                return {"error": f"Post with slug '{slug}' not found"}
+            # The slug is read from the body too: the cached slug -> pk mapping may no longer hold
+            invalidate_slug_lookup(slug, "Post")
+            logger.info("Post %s content updated successfully", slug)
             return {
                 "success": True,
                 "message": f"Post '{slug}' updated successfully",
                 "post_id": post.id
             }
         except Exception as e:
-            logger.error(f"Error updating post {slug}: {e}")
+            logger.error("Error updating post %s: %s", slug, e)
             return {"error": str(e)}
 
     @staticmethod
@@ -134,25 +180,24 @@ class PostAgentPlugins:
         Returns:
             List of category names
         """
-        post = PostAgentPlugins._find_post_by_slug(slug)
+        post = PostAgentPlugins._find_post_by_slug(slug, fields=('id',))
         if not post:
             return []
 
-        # This is a placeholder - you'll need to implement based on your actual schema
+        return PostAgentPlugins._category_names(post.id, slug)
+
+    @staticmethod
+    def _category_names(post_id: int, slug: str) -> List[str]:
+        """Category names of a post ([] on error); `slug` is only used for logging."""
         # The categorizable table uses content_type and object_id
         try:
-            from django.contrib.contenttypes.models import ContentType
-            from friday_night_assistant.models.pg_models.models import Categorizable
-
-            content_type = ContentType.objects.get_for_model(Post)
-            categorizables = Categorizable.objects.filter(
-                content_type=content_type,
-                object_id=post.id
-            ).select_related('category')
-
-            return [cat.category.name for cat in categorizables]
+            # Names only: one join on categories, no model instances
+            return list(Categorizable.objects.filter(
+                content_type=ContentType.objects.get_for_model(Post),
+                object_id=post_id
+            ).values_list('category__name', flat=True))
         except Exception as e:
-            logger.error(f"Error fetching categories for post {slug}: {e}")
+            logger.error("Error fetching categories for post %s: %s", slug, e)
             return []
 
     @staticmethod
@@ -191,47 +236,21 @@ class PostAgentPlugins:
         return analysis
 
     @staticmethod
-    def _find_post_by_slug(slug: str) -> Optional[Post]:
+    def _find_post_by_slug(slug: str, fields: Optional[Tuple[str, ...]] = None) -> Optional[Post]:
         """Find Post by slug with multiple fallback strategies.
 
+        Strategies, in priority order: direct slug field, JSON field search
+        (body, title), case-insensitive text search (title, body).
+
         Args:
             slug: The post slug to search for
+            fields: Columns to load (all when None); the search itself is unaffected
 
         Returns:
             Post object if found, None otherwise
         """
-        # Strategy 1: Direct slug field
-        try:
-            return Post.objects.get(slug=slug)
-        except (FieldError, Post.DoesNotExist):
-            pass
-
-        # Strategy 2: JSON fields search
-        for field in ["body", "title"]:
-            try:
-                post = Post.objects.filter(
-                    **{f"{field}__contains": {"slug": slug}}
-                ).first()
-                if post:
-                    logger.info(f"Post found via JSON field: {field}")
-                    return post
-            except Exception as e:
-                logger.debug(f"JSON search failed for field {field}: {e}")
-                continue
-
-        # Strategy 3: Case-insensitive text search
-        for field in ["title", "body"]:
-            try:
-                post = Post.objects.filter(
-                    **{f"{field}__icontains": slug}
-                ).first()
-                if post:
-                    logger.info(f"Post found via text search: {field}")
-                    return post
-            except Exception as e:
-                logger.debug(f"Text search failed for field {field}: {e}")
-                continue
-
-        logger.warning(f"Post not found for slug: {slug}")
-        return None
+        queryset = Post.objects.only(*fields) if fields else Post.objects.all()
+        # Direct slug and JSON fields first, text search only on a miss;
+        # the resolved pk is cached and shared with the main agent's post lookups
+        return find_by_slug(queryset, slug, "Post")
 
@@ -0,0 +1,138 @@
+"""Slug lookups shared by the agent plugins.
+
+Posts are matched by slug through several strategies (slug column, JSON
+containment on body/title, text search); `search_by_slug` runs the indexed
+ones first and the text search only when they miss. `cached_slug_lookup` remembers the
+resolved primary key, so the same slug looked up again only searches that row.
+"""
+
+from functools import lru_cache
+from typing import Any, Callable, Dict, List
+import hashlib
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, IntegerField, Q, Value, When
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def model_field_names(model) -> frozenset:
+    """Field names of a model, introspected once per model class."""
+    return frozenset(f.name for f in model._meta.get_fields())
+
+
+def first_by_priority(queryset, lookups: List[Dict[str, Any]]):
+    """Return the first object matching any of `lookups`, in a single query.
+
+    Objects matching an earlier lookup win: the CASE annotation encodes the
+    position of the first matching lookup. The matched index is left on the
+    object as `_slug_priority`.
+    """
+    condition = Q()
+    whens = []
+    for priority, lookup in enumerate(lookups):
+        condition |= Q(**lookup)
+        whens.append(When(Q(**lookup), then=Value(priority)))
+    return (
+        queryset.filter(condition)
+        .annotate(_slug_priority=Case(*whens, output_field=IntegerField()))
+        .order_by('_slug_priority', 'pk')
+        .first()
+    )
+
+
+def search_by_slug(queryset, slug: str, label: str, verify=None):
+    """Run the slug search strategies against the database.
+
+    The structural lookups (slug column, JSON containment on body/title) run
+    first, as one query ordered by priority. The text search on title/body,
+    which scans far more rows, only runs when they find nothing (or are not
+    supported), and is skipped when settings.SLUG_LOOKUP_TEXT_SEARCH is false.
+    `verify` optionally rejects a candidate found without database filtering.
+    """
+    structural = [
+        {"body__contains": {"slug": slug}},
+        {"title__contains": {"slug": slug}},
+    ]
+    # Direct slug match first, only if the model actually has the column
+    if "slug" in model_field_names(queryset.model):
+        structural.insert(0, {"slug": slug})
+    # icontains on title/body: served by the trigram indexes, can be switched off entirely
+    text = [
+        {"title__icontains": slug},
+        {"body__icontains": slug},
+    ] if settings.SLUG_LOOKUP_TEXT_SEARCH else []
+
+    found = None
+    for lookups in (structural, text):
+        if not lookups:
+            continue
+        try:
+            found = first_by_priority(queryset, lookups)
+        except Exception as e:
+            logger.debug("%s lookup failed for slug=%s: %s", label, slug, e)
+        if found is not None:
+            break
+
+    if found and (verify is None or verify(found)):
+        lookup = next(iter(lookups[found._slug_priority]))
+        if lookup.endswith("__icontains"):
+            stage = "text search"
+        elif lookup.endswith("__contains"):
+            stage = "JSON field"
+        else:
+            stage = "slug field"
+        logger.info("%s found via %s: %s", label, stage, lookup.split('__')[0])
+        return found
+
+    return None
+
+
+def _slug_cache_key(slug: str, label: str) -> str:
+    return f"slug_lookup:{label}:{hashlib.sha256(slug.encode()).hexdigest()}"
+
+
+def cached_slug_lookup(queryset, slug: str, label: str, search: Callable):
+    """Resolve `slug` with `search(queryset)`, caching the found primary key.
+
+    The pk is kept in the Django cache for SLUG_LOOKUP_CACHE_TTL seconds (0
+    disables it) under a key per `label`, so lookups sharing a label must use
+    the same search. On a hit the search is re-run restricted to the cached
+    pk: the slug may live in columns that were rewritten since (a Post's
+    body/title), so the row must still match to be returned.
+    """
+    ttl = settings.SLUG_LOOKUP_CACHE_TTL
+    if ttl <= 0:
+        return search(queryset)
+
+    key = _slug_cache_key(slug, label)
+    pk = cache.get(key)
+    if pk is not None:
+        found = search(queryset.filter(pk=pk))
+        if found is not None:
+            return found
+        # Deleted or no longer matching since it was cached
+        cache.delete(key)
+
+    found = search(queryset)
+    if found is not None:
+        cache.set(key, found.pk, ttl)
+    return found
+
+
+def invalidate_slug_lookup(slug: str, label: str) -> None:
+    """Forget the cached pk of `slug`, e.g. after the row it points to was rewritten."""
+    cache.delete(_slug_cache_key(slug, label))
+
+
+def find_by_slug(queryset, slug: str, label: str, verify=None):
+    """`search_by_slug` behind `cached_slug_lookup`."""
+    found = cached_slug_lookup(
+        queryset, slug, label, lambda qs: search_by_slug(qs, slug, label, verify)
+    )
+    if found is None:
+        logger.warning("%s not found for slug: %s", label, slug)
+    return found
@@ -1,16 +1,70 @@
 """Plugin interface for TutorialAgent - specialized in tutorial operations."""
 
-from typing import Optional, List, Dict, Any
+from functools import lru_cache
+from typing import Optional, List, Dict, Any, Tuple
 import logging
 import html2text
 import unicodedata
 import html
 
-from friday_night_assistant.models.pg_models.models import Tutorial
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import BooleanField
+from django.db.models.expressions import RawSQL
+
+from friday_night_assistant import json_utils
+from friday_night_assistant.models.pg_models.models import Categorizable, Tutorial
+from friday_night_assistant.plugins.slug_search import cached_slug_lookup
 
 
 logger = logging.getLogger(__name__)
 
+# Keywords looked up by check_tutorial_prerequisites (substring match on the lowercased body).
+# Keywords containing a shorter one of the same group are left out: "prerequisites" and
+# "installation" always match whenever they are present, via "prerequisite" and "install",
+# so scanning for them only costs an extra pass over bodies that match nothing.
+PREREQUISITE_KEYWORDS = ("prerequisite", "before you start", "requirements")
+SETUP_KEYWORDS = ("setup", "install", "getting started")
+REQUIREMENT_KEYWORDS = ("require", "need", "must have")
+
+
+def _html_to_markdown(content: str) -> str:
+    """Convert a tutorial HTML body to Markdown for the agent.
+
+    Each step skips its copy when there is nothing to do: html.unescape returns
+    the input when it has no '&', _to_nfc when it is already NFC.
+    """
+    # Step 1: Unescape HTML entities (e.g., &ugrave; -> ù)
+    # Step 2: Normalize UTF-8
+    normalized = _to_nfc(html.unescape(content))
+    # Step 3: Convert to Markdown (no hard wrapping: single \n are joined below anyway)
+    markdown = html2text.html2text(normalized, bodywidth=0)
+    # Step 4: Replace single \n with space, but keep \n\n
+    return _join_wrapped_lines(markdown)
+
+
+def _to_nfc(text: str) -> str:
+    """NFC-normalize `text`, without copying it when it is already NFC (the common case)."""
+    if unicodedata.is_normalized('NFC', text):
+        return text
+    return unicodedata.normalize('NFC', text)
+
+
+def _join_wrapped_lines(markdown: str) -> str:
+    """Replace single newlines with spaces, keeping paragraph breaks (\\n\\n).
+
+    Splitting on \\n\\n pairs them left to right exactly like str.replace, without
+    the placeholder round trip over the whole text.
+    """
+    return '\n\n'.join(part.replace('\n', ' ') for part in markdown.split('\n\n'))
+
+
+def _slug_jsonpath(slug: str) -> str:
+    """jsonpath matching `slug` as the value of any top-level key.
+
+    The slug is embedded as a JSON string literal (same escaping as jsonpath).
+    """
+    return f"$.* ? (@ == {json_utils.dumps(slug)})"
+
 
 class TutorialAgentPlugins:
     """Helper methods for TutorialAgent functionality - specialized for tutorials."""
@@ -19,6 +73,7 @@ class TutorialAgentPlugins:
         pass
 
     @staticmethod
+    @lru_cache(maxsize=None)
     def get_available_methods() -> List[Dict[str, Any]]:
         """Return list of available methods for TutorialAgent."""
         return [
@@ -99,37 +154,19 @@ class TutorialAgentPlugins:
         Returns:
             Dictionary with tutorial details or None if not found
         """
-        tutorial = TutorialAgentPlugins._find_tutorial_by_slug(slug)
+        tutorial = TutorialAgentPlugins._find_tutorial_by_slug(slug, fields=('id', 'title', 'body', 'status'))
         if not tutorial:
             return None
 
         body = tutorial.body
         if isinstance(body, dict):
             # Convert each language's HTML to Markdown
-            markdown_body = {}
-            for lang, content in body.items():
-                if isinstance(content, str):
-                    # Step 1: Unescape HTML entities (e.g., &ugrave; -> ù)
-                    unescaped_content = html.unescape(content)
-                    # Step 2: Normalize UTF-8
-                    normalized_content = unicodedata.normalize('NFC', unescaped_content)
-                    # Step 3: Convert to Markdown
-                    markdown = html2text.html2text(normalized_content)
-                    # Step 4: Replace single \n with space, but keep \n\n
-                    markdown = markdown.replace('\n\n', '<<<DOUBLE_NEWLINE>>>').replace('\n', ' ').replace('<<<DOUBLE_NEWLINE>>>', '\n\n')
-                    markdown_body[lang] = markdown
-                else:
-                    markdown_body[lang] = content
-            body = markdown_body
+            body = {
+                lang: _html_to_markdown(content) if isinstance(content, str) else content
+                for lang, content in body.items()
+            }
         elif isinstance(body, str):
-            # Step 1: Unescape HTML entities
-            unescaped_body = html.unescape(body)
-            # Step 2: Normalize UTF-8
-            normalized_body = unicodedata.normalize('NFC', unescaped_body)
-            # Step 3: Convert to Markdown
-            markdown = html2text.html2text(normalized_body)
-            # Step 4: Replace single \n with space, but keep \n\n
-            body = markdown.replace('\n\n', '<<<DOUBLE_NEWLINE>>>').replace('\n', ' ').replace('<<<DOUBLE_NEWLINE>>>', '\n\n')
+            body = _html_to_markdown(body)
 
         return {
             "id": tutorial.id,
@@ -149,21 +186,22 @@ class TutorialAgentPlugins:
         Returns:
             Dict with success status
         """
-        tutorial = TutorialAgentPlugins._find_tutorial_by_slug(slug)
+        # Only the pk is needed: the body is written with a single UPDATE of that column
+        tutorial = TutorialAgentPlugins._find_tutorial_by_slug(slug, fields=('id',))
         if not tutorial:
             return {"error": f"Tutorial with slug '{slug}' not found"}
 
         try:
-            tutorial.body = new_content
-            tutorial.save()
-            logger.info(f"Tutorial {slug} content updated successfully")
+            if not Tutorial.objects.filter(pk=tutorial.pk).update(body=new_content):
+                return {"error": f"Tutorial with slug '{slug}' not found"}
+            logger.info("Tutorial %s content updated successfully", slug)
             return {
                 "success": True,
                 "message": f"Tutorial '{slug}' updated successfully",
                 "tutorial_id": tutorial.id
             }
         except Exception as e:
-            logger.error(f"Error updating tutorial {slug}: {e}")
+            logger.error("Error updating tutorial %s: %s", slug, e)
             return {"error": str(e)}
 
     @staticmethod
@@ -176,23 +214,18 @@ class TutorialAgentPlugins:
         Returns:
             List of category names
         """
-        tutorial = TutorialAgentPlugins._find_tutorial_by_slug(slug)
+        tutorial = TutorialAgentPlugins._find_tutorial_by_slug(slug, fields=('id',))
         if not tutorial:
             return []
 
         try:
-            from django.contrib.contenttypes.models import ContentType
-            from friday_night_assistant.models.pg_models.models import Categorizable
-
-            content_type = ContentType.objects.get_for_model(Tutorial)
-            categorizables = Categorizable.objects.filter(
-                content_type=content_type,
+            # Names only: one join on categories, no model instances
+            return list(Categorizable.objects.filter(
+                content_type=ContentType.objects.get_for_model(Tutorial),
                 object_id=tutorial.id
-            ).select_related('category')
-
-            return [cat.category.name for cat in categorizables]
+            ).values_list('category__name', flat=True))
         except Exception as e:
-            logger.error(f"Error fetching categories for tutorial {slug}: {e}")
+            logger.error("Error fetching categories for tutorial %s: %s", slug, e)
             return []
 
     @staticmethod
@@ -205,7 +238,7 @@ class TutorialAgentPlugins:
         Returns:
             Dict with structure metrics
         """
-        tutorial = TutorialAgentPlugins._find_tutorial_by_slug(slug)
+        tutorial = TutorialAgentPlugins._find_tutorial_by_slug(slug, fields=('id', 'title', 'body', 'status'))
         if not tutorial:
             return {"error": f"Tutorial with slug '{slug}' not found"}
 
@@ -241,7 +274,7 @@ class TutorialAgentPlugins:
         Returns:
             Dict with prerequisites check
         """
-        tutorial = TutorialAgentPlugins._find_tutorial_by_slug(slug)
+        tutorial = TutorialAgentPlugins._find_tutorial_by_slug(slug, fields=('id', 'body'))
         if not tutorial:
             return {"error": f"Tutorial with slug '{slug}' not found"}
 
@@ -263,16 +296,13 @@ class TutorialAgentPlugins:
             if content_str:
                 content_lower = content_str.lower()
                 check_results["has_prerequisites"] = any(
-                    keyword in content_lower
-                    for keyword in ["prerequisite", "prerequisites", "before you start", "requirements"]
+                    keyword in content_lower for keyword in PREREQUISITE_KEYWORDS
                 )
                 check_results["has_setup"] = any(
-                    keyword in content_lower
-                    for keyword in ["setup", "installation", "install", "getting started"]
+                    keyword in content_lower for keyword in SETUP_KEYWORDS
                 )
                 check_results["has_requirements"] = any(
-                    keyword in content_lower
-                    for keyword in ["require", "need", "must have"]
+                    keyword in content_lower for keyword in REQUIREMENT_KEYWORDS
                 )
 
         return check_results
@@ -298,30 +328,34 @@ class TutorialAgentPlugins:
         }
 
     @staticmethod
-    def _find_tutorial_by_slug(slug: str) -> Optional[Tutorial]:
+    def _find_tutorial_by_slug(slug: str, fields: Optional[Tuple[str, ...]] = None) -> Optional[Tutorial]:
         """Find Tutorial by slug in any language.
 
         Args:
             slug: The tutorial slug to search for
+            fields: Columns to load (all when None); the slug filter is unaffected
 
         Returns:
             Tutorial object if found, None otherwise
         """
         try:
-            # PostgreSQL JSONB: cerca il valore in qualsiasi chiave del campo slug
-            tutorial = Tutorial.objects.filter(
-                slug__isnull=False
-            ).extra(
-                where=["EXISTS (SELECT 1 FROM jsonb_each_text(slug) WHERE value = %s)"],
-                params=[slug]
-            ).first()
+            # Slug in any language key: `slug @? '$.* ? (@ == "<slug>")'` can use the
+            # GIN index on tutorials.slug, unlike expanding every row with jsonb_each_text.
+            # The resolved pk is cached, so the agent's follow-up calls fetch by pk.
+            queryset = Tutorial.objects.only(*fields) if fields else Tutorial.objects.all()
+            tutorial = cached_slug_lookup(
+                queryset, slug, "Tutorial",
+                lambda qs: qs.filter(
+                    RawSQL("slug @? %s::jsonpath", [_slug_jsonpath(slug)], output_field=BooleanField())
+                ).first()
+            )
 
             if tutorial:
                 return tutorial
 
-            logger.warning(f"Tutorial not found for slug: {slug}")
+            logger.warning("Tutorial not found for slug: %s", slug)
             return None
 
         except Exception as e:
-            logger.error(f"Error searching tutorial by slug '{slug}': {e}")
+            logger.error("Error searching tutorial by slug '%s': %s", slug, e)
             return None
@@ -83,6 +83,14 @@ WSGI_APPLICATION = 'friday_night_assistant.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Persistent connections: keep each connection open for DB_CONN_MAX_AGE seconds
+# instead of reconnecting per request. For many concurrent workers put
+# pgbouncer/ProxySQL in front and point the HOST settings at it.
+DB_CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', '600'))
+# Set to true when Postgres is behind pgbouncer in transaction pooling mode:
+# server-side cursors do not survive across pooled transactions
+POSTGRES_BEHIND_PGBOUNCER = os.getenv('POSTGRES_BEHIND_PGBOUNCER', 'false').lower() in ('true', '1', 'yes')
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.mysql',
@@ -91,6 +99,8 @@ DATABASES = {
         'PASSWORD': os.getenv('MYSQL_PASSWORD', ''),
         'HOST': os.getenv('MYSQL_HOST', 'localhost'),
         'PORT': os.getenv('MYSQL_PORT', '3306'),
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
         'OPTIONS': {
             'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
         },
@@ -102,6 +112,9 @@ DATABASES = {
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
         'HOST': os.getenv('POSTGRES_HOST', 'localhost'),
         'PORT': os.getenv('POSTGRES_PORT', '5432'),
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'DISABLE_SERVER_SIDE_CURSORS': POSTGRES_BEHIND_PGBOUNCER,
     }
 }
 
@@ -109,6 +122,36 @@ DATABASES = {
 DATABASE_ROUTERS = ['friday_night_assistant.db_routers.DatabaseAppsRouter']
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Shared Redis cache when REDIS_URL is set, per-process memory otherwise.
+
+REDIS_URL = os.getenv('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Seconds an LLM decision is reused for an identical agent prompt (0 disables the cache)
+AGENT_DECISION_CACHE_TTL = int(os.getenv('AGENT_DECISION_CACHE_TTL', '300'))
+
+# Seconds a slug -> post id resolution is reused by the agent plugins (0 disables the cache)
+SLUG_LOOKUP_CACHE_TTL = int(os.getenv('SLUG_LOOKUP_CACHE_TTL', '300'))
+# Set to false to match slugs only structurally (slug column, JSON slug keys), skipping the
+# icontains text search on post titles/bodies that runs when nothing else matches
+SLUG_LOOKUP_TEXT_SEARCH = os.getenv('SLUG_LOOKUP_TEXT_SEARCH', 'true').lower() in ('true', '1', 'yes')
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -150,7 +193,33 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Logging
+# https://docs.djangoproject.com/en/5.2/topics/logging/
+# Application loggers are configured here; modules only call logging.getLogger(__name__).
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'friday_night_assistant': {
+            'handlers': ['console'],
+            'level': os.getenv('APP_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+        'friday_night_assistant.llm': {
+            'level': os.getenv('LLM_LOG_LEVEL', os.getenv('APP_LOG_LEVEL', 'WARNING')),
+        },
+    },
+}
+
 # Ollama settings
 OLLAMA_HOST = os.getenv('HOST')
 OLLAMA_PORT = os.getenv('OLLAMA_PORT')
 OLLAMA_FULL_HOST = f"{OLLAMA_HOST}:{OLLAMA_PORT}"
+# How long Ollama keeps the model loaded after a request (duration string, "-1" = forever)
+OLLAMA_KEEP_ALIVE = os.getenv('OLLAMA_KEEP_ALIVE', '30m')